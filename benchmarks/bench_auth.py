@@ -0,0 +1,35 @@
+"""Per-request access-token verification cost, with and without the token cache.
+
+Run from the repository root:  python benchmarks/bench_auth.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.cache import token_cache
+from src.core.security import create_access_token, verify_access_token
+
+N = 100_000
+
+
+def main():
+    token = create_access_token(data={"user_id": "6bede393-3861-47b2-8be2-1c212c77de86"})
+
+    maxsize = token_cache.maxsize
+    token_cache.maxsize = 0
+    uncached = timeit.timeit(lambda: verify_access_token(token), number=N) / N
+    token_cache.maxsize = maxsize
+
+    token_cache.clear()
+    verify_access_token(token)
+    cached = timeit.timeit(lambda: verify_access_token(token), number=N) / N
+
+    print(f"jwt.decode every request: {uncached * 1e6:8.2f} us/request")
+    print(f"token cache hit:          {cached * 1e6:8.2f} us/request")
+    print(f"speedup:                  {uncached / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
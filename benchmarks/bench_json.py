@@ -0,0 +1,54 @@
+"""Serializing a large booking list: FastAPI's default response_model path
+(re-validate, jsonable_encoder, json.dumps) versus ValidatedJSONResponse.
+
+Run from the repository root:  python benchmarks/bench_json.py
+"""
+import asyncio
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.core.responses import ValidatedJSONResponse
+from src.schemas import BookingResponse, CursorPage
+
+N = 10_000
+ROUNDS = 10
+BookingList = list[BookingResponse] | CursorPage[BookingResponse]
+
+
+def main():
+    start = datetime(2030, 1, 1, 9)
+    resource_id, user_id = uuid.uuid4(), uuid.uuid4()
+    bookings = [
+        BookingResponse(id=uuid.uuid4(), resource_id=resource_id, user_id=user_id, total_price=25.0,
+                        start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i, minutes=90))
+        for i in range(N)
+    ]
+    field = create_model_field(name="Response", type_=BookingList, mode="serialization")
+
+    def default_path():
+        content = asyncio.run(serialize_response(field=field, response_content=bookings))
+        return JSONResponse(content).body
+
+    def fast_path():
+        return ValidatedJSONResponse(bookings, BookingList).body
+
+    assert default_path() == fast_path().replace(b" ", b"")
+    default = min(timeit.repeat(default_path, number=1, repeat=ROUNDS))
+    fast = min(timeit.repeat(fast_path, number=1, repeat=ROUNDS))
+
+    print(f"response_model + json.dumps: {default * 1e3:8.2f} ms for {N} bookings")
+    print(f"ValidatedJSONResponse:       {fast * 1e3:8.2f} ms for {N} bookings")
+    print(f"speedup:                     {default / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
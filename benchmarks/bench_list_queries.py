@@ -0,0 +1,72 @@
+"""Rows/sec of the list endpoints' crud + response building: full ORM objects
+validated with from_attributes versus the projected rows the get_all_* queries
+now return. Read-only; it pages through whatever rows the database holds.
+
+Run from the repository root:  python benchmarks/bench_list_queries.py [DATABASE_URL]
+(defaults to the application's configured database)
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.crud import paginate, response_columns
+from src.models import Bookings, Facilities, Resources, Users
+from src.schemas import BookingResponse, FacilityResponse, ResourceResponse, UserResponse
+
+PAGE_SIZE = 500
+ROUNDS = 5
+
+CASES = [
+    (Users, UserResponse, "created_at"),
+    (Facilities, FacilityResponse, "created_at"),
+    (Resources, ResourceResponse, "created_at"),
+    (Bookings, BookingResponse, "start_time"),
+]
+
+
+async def orm_page(db, model, schema, sort_key):
+    result = await db.execute(paginate(select(model), (getattr(model, sort_key), model.id), PAGE_SIZE, 0))
+    return [schema.model_validate(row) for row in result.scalars().all()]
+
+
+async def projected_page(db, model, schema, sort_key):
+    query = select(*response_columns(model, schema, sort_key))
+    result = await db.execute(paginate(query, (getattr(model, sort_key), model.id), PAGE_SIZE, 0))
+    return [schema.model_validate(row._asdict()) for row in result.all()]
+
+
+async def best_rate(sessionmaker, page, *args) -> tuple[int, float]:
+    best, rows = float("inf"), 0
+    for _ in range(ROUNDS):
+        # a fresh session each round so the identity map starts empty, as it does per request
+        async with sessionmaker() as db:
+            started = time.perf_counter()
+            rows = len(await page(db, *args))
+            best = min(best, time.perf_counter() - started)
+    return rows, rows / best if rows else 0.0
+
+
+async def main():
+    if len(sys.argv) > 1:
+        engine = create_async_engine(sys.argv[1])
+    else:
+        from src.core.db import engine
+    sessionmaker = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    print(f"{'table':12} {'rows':>6} {'orm rows/s':>12} {'projected rows/s':>17} {'speedup':>8}")
+    for model, schema, sort_key in CASES:
+        rows, orm = await best_rate(sessionmaker, orm_page, model, schema, sort_key)
+        _, projected = await best_rate(sessionmaker, projected_page, model, schema, sort_key)
+        speedup = f"{projected / orm:7.2f}x" if orm else "      -"
+        print(f"{model.__tablename__:12} {rows:6} {orm:12.0f} {projected:17.0f} {speedup:>8}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
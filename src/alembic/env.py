@@ -11,7 +11,7 @@ from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 from src.core.config import settings
 from src.core.db import Base
-from src.models import Users, Resources, Bookings, Facilities 
+from src.models import Users, Resources, Bookings, Facilities, BookingSeries
 import asyncpg
 from alembic import context
 
@@ -0,0 +1,43 @@
+"""booking period exclusion constraint
+
+Revision ID: 4b7e2c91d0a3
+Revises: 6d01437989ea
+Create Date: 2026-10-18 10:02:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2c91d0a3'
+down_revision: Union[str, Sequence[str], None] = '6d01437989ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gist provides the gist "=" operator class for the uuid resource_id
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.add_column('bookings', sa.Column(
+        'period',
+        postgresql.TSRANGE(),
+        sa.Computed("tsrange(start_time, end_time, '[)')", persisted=True),
+        nullable=True,
+    ))
+    op.create_exclude_constraint(
+        'excl_booking_resource_period',
+        'bookings',
+        ('resource_id', '='),
+        ('period', '&&'),
+        using='gist',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('excl_booking_resource_period', 'bookings')
+    op.drop_column('bookings', 'period')
@@ -0,0 +1,39 @@
+"""facility coordinates
+
+Revision ID: 7c3e9a1f5b28
+Revises: e5a2b7d91c34
+Create Date: 2026-10-18 16:40:05.913384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e9a1f5b28'
+down_revision: Union[str, Sequence[str], None] = 'e5a2b7d91c34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('facilities', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('facilities', sa.Column('longitude', sa.Float(), nullable=True))
+    op.create_index('ix_facility_lat_lon', 'facilities', ['latitude', 'longitude'], unique=False)
+    op.create_check_constraint(
+        'facility_coordinates_valid',
+        'facilities',
+        '(latitude IS NULL AND longitude IS NULL) OR '
+        '(latitude BETWEEN -90 AND 90 AND longitude BETWEEN -180 AND 180)',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('facility_coordinates_valid', 'facilities', type_='check')
+    op.drop_index('ix_facility_lat_lon', table_name='facilities')
+    op.drop_column('facilities', 'longitude')
+    op.drop_column('facilities', 'latitude')
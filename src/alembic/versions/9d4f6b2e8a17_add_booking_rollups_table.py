@@ -0,0 +1,39 @@
+"""add booking_rollups table
+
+Revision ID: 9d4f6b2e8a17
+Revises: 7c3e9a1f5b28
+Create Date: 2026-10-18 18:12:47.204519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f6b2e8a17'
+down_revision: Union[str, Sequence[str], None] = '7c3e9a1f5b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # populate existing history afterwards with: python -m src.backfill_rollups
+    op.create_table('booking_rollups',
+    sa.Column('resource_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('booking_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.Column('booked_minutes', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['resource_id'], ['resources.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('resource_id', 'day')
+    )
+    op.create_index('ix_booking_rollups_day', 'booking_rollups', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_rollups_day', table_name='booking_rollups')
+    op.drop_table('booking_rollups')
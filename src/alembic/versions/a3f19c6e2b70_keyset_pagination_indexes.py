@@ -0,0 +1,36 @@
+"""keyset pagination indexes
+
+Revision ID: a3f19c6e2b70
+Revises: 4b7e2c91d0a3
+Create Date: 2026-10-18 11:27:09.542118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f19c6e2b70'
+down_revision: Union[str, Sequence[str], None] = '4b7e2c91d0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_facility_created_id', 'facilities', ['created_at', 'id'], unique=False)
+    op.create_index('ix_resource_created_id', 'resources', ['created_at', 'id'], unique=False)
+    op.create_index('ix_resource_facility_created_id', 'resources', ['facility_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_booking_start_id', 'bookings', ['start_time', 'id'], unique=False)
+    op.create_index('ix_booking_user_start_id', 'bookings', ['user_id', 'start_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_user_start_id', table_name='bookings')
+    op.drop_index('ix_booking_start_id', table_name='bookings')
+    op.drop_index('ix_resource_facility_created_id', table_name='resources')
+    op.drop_index('ix_resource_created_id', table_name='resources')
+    op.drop_index('ix_facility_created_id', table_name='facilities')
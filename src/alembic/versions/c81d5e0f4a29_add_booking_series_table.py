@@ -0,0 +1,53 @@
+"""add booking series table
+
+Revision ID: c81d5e0f4a29
+Revises: a3f19c6e2b70
+Create Date: 2026-10-18 13:05:52.771940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81d5e0f4a29'
+down_revision: Union[str, Sequence[str], None] = 'a3f19c6e2b70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('booking_series',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('resource_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('frequency', sa.String(length=10), nullable=False),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('first_start', sa.DateTime(), nullable=False),
+    sa.Column('first_end', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('until', sa.DateTime(), nullable=True),
+    sa.Column('ends_at', sa.DateTime(), nullable=False),
+    sa.Column('price_per_occurrence', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.CheckConstraint("frequency IN ('daily', 'weekly')", name='booking_series_frequency'),
+    sa.CheckConstraint('count IS NOT NULL OR until IS NOT NULL', name='booking_series_bounded'),
+    sa.ForeignKeyConstraint(['resource_id'], ['resources.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_booking_series_resource_span', 'booking_series', ['resource_id', 'first_start', 'ends_at'], unique=False)
+    op.create_index(op.f('ix_booking_series_resource_id'), 'booking_series', ['resource_id'], unique=False)
+    op.create_index(op.f('ix_booking_series_user_id'), 'booking_series', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_booking_series_user_id'), table_name='booking_series')
+    op.drop_index(op.f('ix_booking_series_resource_id'), table_name='booking_series')
+    op.drop_index('ix_booking_series_resource_span', table_name='booking_series')
+    op.drop_table('booking_series')
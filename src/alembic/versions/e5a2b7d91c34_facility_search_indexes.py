@@ -0,0 +1,44 @@
+"""facility search indexes
+
+Revision ID: e5a2b7d91c34
+Revises: c81d5e0f4a29
+Create Date: 2026-10-18 15:12:48.207731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a2b7d91c34'
+down_revision: Union[str, Sequence[str], None] = 'c81d5e0f4a29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('facilities', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, coalesce(city, '')), 'B') || "
+            "setweight(to_tsvector('simple'::regconfig, coalesce(address, '')), 'C')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_facility_search_vector', 'facilities', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_facility_amenities', 'facilities', ['amenities'], unique=False, postgresql_using='gin', postgresql_ops={'amenities': 'jsonb_path_ops'})
+    op.create_index('ix_facility_city_state_lower', 'facilities', [sa.text('lower(city)'), sa.text('lower(state)')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_facility_city_state_lower', table_name='facilities')
+    op.drop_index('ix_facility_amenities', table_name='facilities')
+    op.drop_index('ix_facility_search_vector', table_name='facilities')
+    op.drop_column('facilities', 'search_vector')
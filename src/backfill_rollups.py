@@ -0,0 +1,43 @@
+"""Rebuild booking_rollups from bookings and recurring series occurrences.
+
+    python -m src.backfill_rollups [--from 2024-01-01] [--to 2025-01-01] [--batch-days 31]
+
+Each batch of days is recomputed in its own short transaction, so this can
+run against a live database: once after the migration that adds the table,
+and periodically (e.g. nightly) as a reconciliation job.
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+import src.crud as crud
+from src.core.db import AsyncSessionLocal
+
+
+async def backfill(start: date | None, end: date | None, batch_days: int) -> None:
+    async with AsyncSessionLocal() as db:
+        if start is None or end is None:
+            day_range = await crud.get_booking_day_range(db)
+            if day_range is None:
+                print("No bookings.")
+                return
+            start = start or day_range[0]
+            end = end or day_range[1] + timedelta(days=1)
+        day = start
+        while day < end:
+            batch_end = min(day + timedelta(days=batch_days), end)
+            rows = await crud.rebuild_booking_rollups(db, day, batch_end)
+            print(f"{day} - {batch_end}: {rows} rollup rows")
+            day = batch_end
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild booking_rollups from bookings and series in batched passes.")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="first day (defaults to the earliest booking or series)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="day after the last one (defaults to after the latest booking or series)")
+    parser.add_argument("--batch-days", type=int, default=31, help="days recomputed per transaction")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.start, args.end, args.batch_days))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,171 @@
+import bisect
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from src.core.config import settings
 import asyncpg
 
 
 DATABASE_URL = str(settings.SQLALCHEMY_DATABASE_URI)
 
-engine = create_async_engine(
-    DATABASE_URL, 
-    echo= (settings.ENVIRONMENT == "local"), 
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    pool_recycle=600,
-    connect_args={"ssl": "require"})
+
+class PoolMetrics:
+    """Checkout counts and a cumulative histogram of checkout wait times.
+
+    Per process, like the pool itself; every uvicorn worker reports its own.
+    """
+
+    # upper bounds in seconds, Prometheus style; the last bucket is +Inf
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self._bucket_counts = [0] * (len(self.BUCKETS) + 1)
+
+    def observe(self, seconds: float, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        if timed_out:
+            self.timeouts += 1
+        self.wait_seconds_total += seconds
+        self._bucket_counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+
+    def histogram(self) -> dict[str, int]:
+        cumulative, total = {}, 0
+        for bound, count in zip((*map(str, self.BUCKETS), "+Inf"), self._bucket_counts):
+            total += count
+            cumulative[bound] = total
+        return cumulative
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    # times every checkout: waiting for a free connection, opening an overflow
+    # one and the pre-ping round trip when enabled. engine.dispose() replaces
+    # the pool, which starts the counts again.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.observe(time.perf_counter() - started, timed_out)
+
+
+def _connect_args() -> dict:
+    args = {
+        "ssl": "require",
+        # asyncpg's own statement cache and SQLAlchemy's prepared statement
+        # cache on top of it; both must be 0 behind pgbouncer in transaction mode
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    if settings.DB_COMMAND_TIMEOUT is not None:
+        args["command_timeout"] = settings.DB_COMMAND_TIMEOUT
+    return args
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO if settings.DB_ECHO is not None else settings.ENVIRONMENT == "local",
+        poolclass=InstrumentedPool,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args=_connect_args())
+
+
+engine = _create_engine(DATABASE_URL)
+# the replica when DB_REPLICA_URL is set, otherwise the primary engine itself
+read_engine = _create_engine(settings.DB_REPLICA_URL) if settings.DB_REPLICA_URL else engine
+
+
+def pool_stats(bind: AsyncEngine = engine) -> dict:
+    pool = bind.sync_engine.pool
+    metrics = pool.metrics
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # negative while the pool has not opened all of its pool_size connections
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "wait_seconds_total": round(metrics.wait_seconds_total, 6),
+        "wait_seconds_histogram": metrics.histogram(),
+    }
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     expire_on_commit=False
 )
 
+# only for reads that may lag the primary; writes always go through AsyncSessionLocal
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=read_engine,
+    expire_on_commit=False
+)
+
 class Base(DeclarativeBase):
     pass
 
+
+class QueryCounter:
+    """Records every statement sent to the database while attached to an engine."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(bind: AsyncEngine | Engine = engine) -> Iterator[QueryCounter]:
+    """Count statements issued on `bind` inside the block.
+
+    Counts everything on the engine, so use it where nothing else is
+    running concurrently (tests, scripts).
+    """
+    target = bind.sync_engine if isinstance(bind, AsyncEngine) else bind
+    counter = QueryCounter()
+    event.listen(target, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(target, "before_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(limit: int, bind: AsyncEngine | Engine = engine) -> Iterator[QueryCounter]:
+    """Fail if the block issues more than `limit` statements.
+
+        with assert_max_queries(3):
+            await update_booking_service(db, booking_id, booking_in)
+    """
+    with count_queries(bind) as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n".join(counter.statements)
+        raise AssertionError(f"expected at most {limit} queries, got {counter.count}:\n{statements}")
@@ -0,0 +1,76 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO
+from PIL import Image, ImageOps
+from src.core.config import settings
+from src.core.storage import url_generate
+
+# name -> longest edge in pixels, smallest first; never upscaled
+IMAGE_VARIANTS = {"thumb": 320, "medium": 800, "large": 1600}
+# what list cards and venue tiles render at
+CARD_IMAGE_EDGE = 320
+WEBP_QUALITY = 80
+
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+# Pillow releases the GIL while decoding, resizing and encoding, so threads
+# are enough to keep this off the event loop without pickling image bytes
+_image_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix="images")
+
+
+def variant_key(original_key: str, variant: str) -> str:
+    stem = original_key.rsplit(".", 1)[0] if "." in original_key.rsplit("/", 1)[-1] else original_key
+    return f"{stem}_{variant}.webp"
+
+
+def _render_derivatives(fileobj: BinaryIO) -> tuple[tuple[int, int], dict[str, tuple[bytes, int, int]]]:
+    fileobj.seek(0)
+    with Image.open(fileobj) as source:
+        # apply the EXIF rotation before anything is resized
+        image = ImageOps.exif_transpose(source)
+        size = image.size
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        derivatives = {}
+        for name, edge in IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+            derivatives[name] = (buffer.getvalue(), resized.width, resized.height)
+            if resized.size == image.size:
+                # the larger variants would be identical copies
+                break
+    fileobj.seek(0)
+    return size, derivatives
+
+
+async def render_derivatives(fileobj: BinaryIO) -> tuple[tuple[int, int], dict[str, tuple[bytes, int, int]]]:
+    """Decode an upload once and encode every IMAGE_VARIANTS size as WebP.
+
+    Raises PIL.UnidentifiedImageError / Image.DecompressionBombError for
+    uploads that are not images or are too large to decode.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_image_executor, _render_derivatives, fileobj)
+
+
+def normalize_image(entry: str | dict[str, Any]) -> dict[str, Any]:
+    # images uploaded before derivatives existed are stored as bare keys
+    if isinstance(entry, str):
+        return {"key": entry, "variants": {}}
+    return entry
+
+
+def image_response_data(entry: str | dict[str, Any]) -> dict[str, Any]:
+    image = normalize_image(entry)
+    return {
+        "url": url_generate(image["key"]),
+        "width": image.get("width"),
+        "height": image.get("height"),
+        "variants": {
+            name: {"url": url_generate(variant["key"]), "width": variant["width"], "height": variant["height"]}
+            for name, variant in image["variants"].items()
+        },
+    }
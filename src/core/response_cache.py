@@ -0,0 +1,229 @@
+import hashlib
+import itertools
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, NamedTuple, Protocol
+from fastapi import Request, Response, status
+from pydantic_core import to_json
+from src.core.cache import TTLCache, user_cache
+from src.core.config import settings
+
+
+class CacheBackend(Protocol):
+    async def get_many(self, keys: list[str]) -> list[bytes | None]: ...
+    async def set(self, key: str, value: bytes, ttl: int) -> None: ...
+    async def bump(self, keys: list[str], ttl: int) -> None: ...
+
+
+class MemoryBackend:
+    """Per-process backend; with several workers each one invalidates only its own copy."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: dict[str, tuple[bytes, float]] = {}
+        self._counter = itertools.count(1)
+        self._ttl = ttl
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        values = []
+        for key in keys:
+            generation = self._generations.get(key)
+            values.append(generation[0] if generation else self._entries.get(key))
+        return values
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries.set(key, value, ttl)
+
+    async def bump(self, keys: list[str], ttl: int) -> None:
+        now = time.monotonic()
+        for key in keys:
+            self._generations[key] = (str(next(self._counter)).encode(), now)
+        if len(self._generations) > self._entries.maxsize:
+            # a generation older than the entry TTL no longer guards any live entry
+            self._generations = {k: v for k, v in self._generations.items() if now - v[1] < self._ttl}
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        # optional dependency, only needed when RESPONSE_CACHE_BACKEND=redis
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return await self._redis.mget(keys)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._redis.set(key, value, ex=ttl)
+
+    async def bump(self, keys: list[str], ttl: int) -> None:
+        # unique tokens rather than INCR, so an expired counter can never restart
+        # at a value that still has entries stored under it
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(key, uuid.uuid4().hex, ex=2 * ttl)
+            await pipe.execute()
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Serialized JSON responses grouped by namespace.
+
+    Every namespace has a generation token that is part of the entry key, so
+    invalidate() drops every entry of a namespace (all pages of a list, every
+    query-string variant) with one write. An entry built from several kinds of
+    data can be stored under a tuple of namespaces and is dropped when any of
+    them is invalidated. Entries are keyed by the generation
+    read *before* loading, so a load racing with an invalidation is stored
+    under the old generation and never served.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def get_or_load(self, namespace: str | tuple[str, ...], key: str, loader: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        async def render() -> bytes:
+            return to_json(await loader())
+        return await self.get_or_render(namespace, key, render)
+
+    async def get_or_render(self, namespace: str | tuple[str, ...], key: str, render: Callable[[], Awaitable[bytes]]) -> CachedResponse:
+        # like get_or_load, for bodies that are already bytes (rendered pages)
+        if self.ttl <= 0:
+            return _cached_response(await render())
+        namespaces = (namespace,) if isinstance(namespace, str) else namespace
+        generations = await self.backend.get_many([f"gen:{ns}" for ns in namespaces])
+        generation = ".".join(g.decode() if g is not None else "0" for g in generations)
+        entry_key = f"resp:{'+'.join(namespaces)}:{generation}:{key}"
+        body = (await self.backend.get_many([entry_key]))[0]
+        if body is None:
+            body = await render()
+            await self.backend.set(entry_key, body, self.ttl)
+        return _cached_response(body)
+
+    async def invalidate(self, *namespaces: str) -> None:
+        if self.ttl > 0 and namespaces:
+            await self.backend.bump([f"gen:{namespace}" for namespace in namespaces], self.ttl)
+
+
+def _cached_response(body: bytes) -> CachedResponse:
+    return CachedResponse(body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"')
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def cached_json_response(request: Request, cached: CachedResponse, media_type: str = "application/json", headers: dict[str, str] | None = None) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": settings.RESPONSE_CACHE_CONTROL, **(headers or {})}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type=media_type, headers=headers)
+
+
+def cached_page_response(request: Request, cached: CachedResponse) -> Response:
+    # only anonymous renders are cached; Vary keeps shared caches from handing
+    # them to signed-in users
+    return cached_json_response(request, cached, media_type="text/html", headers={"Vary": "Cookie"})
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: datetime | None = None
+
+    def headers(self) -> dict[str, str]:
+        headers = {"ETag": self.etag}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified.astimezone(timezone.utc), usegmt=True)
+        return headers
+
+
+def _weak_etag(*parts: Any) -> str:
+    return 'W/"' + hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest() + '"'
+
+
+def object_validators(obj_id: Any, changed_at: datetime) -> Validators:
+    return Validators(_weak_etag(obj_id, changed_at.isoformat()), changed_at)
+
+
+def list_validators(scope: str, page: Iterable[tuple[Any, datetime]], variant: str = "") -> Validators:
+    # from the (id, changed_at) of the rows on the page, so any row joining,
+    # leaving or changing on it changes the tag; no Last-Modified for lists,
+    # since a row leaving the page doesn't move max(updated_at)
+    return Validators(_weak_etag(scope, variant, *(f"{row_id}@{changed_at.isoformat()}" for row_id, changed_at in page)))
+
+
+def _not_modified(request: Request, validators: Validators) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, validators.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # HTTP dates have whole-second precision
+        return validators.last_modified.replace(microsecond=0) <= since
+    return False
+
+
+async def conditional_get(request: Request, response: Response, validators: Validators | None, load: Callable[[], Awaitable[Any]]) -> Any:
+    """Answer 304 from the validators alone, otherwise load the body and tag it.
+
+    The validators come from a cheap version query run before load(), so a
+    change in between only makes the ETag older than the body, never newer.
+    """
+    if validators is None:
+        return await load()
+    if _not_modified(request, validators):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators.headers())
+    response.headers.update(validators.headers())
+    return await load()
+
+
+def make_backend(maxsize: int, ttl: int) -> CacheBackend:
+    # maxsize/ttl bound the memory backend; redis expires keys by their own ttl
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(settings.RESPONSE_CACHE_REDIS_URL)
+    return MemoryBackend(maxsize=maxsize, ttl=ttl)
+
+
+response_cache = ResponseCache(make_backend(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS), ttl=settings.RESPONSE_CACHE_TTL_SECONDS)
+
+
+# Bumped on every user write. get_cached_user only trusts a user_cache entry
+# loaded under the current generation, so with the redis backend a user
+# deactivated or demoted in one worker is reloaded by all of them on their
+# next request; the memory backend only covers the worker that wrote.
+user_generations = make_backend(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def _user_generation_key(user_id: str) -> str:
+    return f"gen:user:{user_id}"
+
+
+async def cached_user_generation(user_id: str) -> bytes | None:
+    if not user_cache.enabled:
+        return None
+    return (await user_generations.get_many([_user_generation_key(user_id)]))[0]
+
+
+async def invalidate_cached_user(user_id: str) -> None:
+    if not user_cache.enabled:
+        return
+    user_cache.invalidate(user_id)
+    await user_generations.bump([_user_generation_key(user_id)], settings.USER_CACHE_TTL_SECONDS)
@@ -0,0 +1,50 @@
+from functools import cache
+from types import UnionType
+from typing import Any, Union, get_args, get_origin
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@cache
+def type_adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _serialized_type(response_model: Any, content: Any) -> Any:
+    # serializing through a union makes pydantic-core try each member in turn,
+    # so pick the one the content already is (list[...] or CursorPage[...])
+    if get_origin(response_model) in (Union, UnionType):
+        for member in get_args(response_model):
+            if isinstance(content, get_origin(member) or member):
+                return member
+    return response_model
+
+
+class ValidatedJSONResponse(Response):
+    """JSON for content the service layer has already validated.
+
+    FastAPI re-validates a returned value against the route's response_model
+    and then encodes it with the stdlib json module; returning this response
+    skips both, and pydantic-core writes the models (UUID, datetime and time
+    included) straight to bytes. Serialization still follows response_model,
+    so fields of a subclass the model doesn't declare are left out as before.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, response_model: Any, *, exclude_unset: bool = False, status_code: int = 200, headers: dict[str, str] | None = None):
+        self.response_model = response_model
+        self.exclude_unset = exclude_unset
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        return type_adapter(_serialized_type(self.response_model, content)).dump_json(content, exclude_unset=self.exclude_unset)
+
+
+def validated_json(content: Any, response_model: Any, response: Response | None = None, exclude_unset: bool = False) -> Response:
+    # responses from conditional_get (a 304) pass through; headers already set on
+    # the injected `response` (ETag, Last-Modified) are carried over
+    if isinstance(content, Response):
+        return content
+    headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")} if response is not None else None
+    return ValidatedJSONResponse(content, response_model, exclude_unset=exclude_unset, headers=headers)
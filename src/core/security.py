@@ -1,8 +1,13 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import jwt
 from jwt.exceptions import InvalidTokenError
 from pwdlib import PasswordHash
 from sqlalchemy import select
 from src.core.config import settings
+from src.core.cache import token_cache
 from datetime import datetime, timedelta, timezone
 
 
@@ -21,6 +26,58 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return password_hasher.verify(plain_password, hashed_password)
 
 
+# Argon2 is deliberately slow; running it inline in an async handler stalls
+# every other request on the worker. The semaphore caps how many hashes are
+# handed to the pool at once, the rest wait (and are counted) on the loop.
+_hash_executor: Executor | None = None
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+_hash_stats = {"in_flight": 0, "waiting": 0, "completed": 0, "max_waiting": 0}
+
+
+def _get_hash_executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash",
+            )
+    return _hash_executor
+
+
+async def _run_in_hash_pool(func, *args):
+    _hash_stats["waiting"] += 1
+    _hash_stats["max_waiting"] = max(_hash_stats["max_waiting"], _hash_stats["waiting"])
+    try:
+        await _hash_slots.acquire()
+    finally:
+        _hash_stats["waiting"] -= 1
+    _hash_stats["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        _hash_stats["in_flight"] -= 1
+        _hash_stats["completed"] += 1
+        _hash_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+def password_hash_pool_stats() -> dict:
+    return {
+        "executor": settings.PASSWORD_HASH_EXECUTOR,
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        **_hash_stats,
+    }
+
+
 
 
 def create_access_token(data: dict, expires_delta: int = TOKEN_EXPIRE_MINUTES):
@@ -31,11 +88,19 @@ def create_access_token(data: dict, expires_delta: int = TOKEN_EXPIRE_MINUTES):
     return encoded_jwt
 
 def verify_access_token(token: str):
+    # the same token is presented on every request for its whole lifetime, so
+    # successfully verified payloads are cached until (at the latest) their exp
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except InvalidTokenError:
         return None
+    exp = payload.get("exp")
+    token_cache.set(key, payload, ttl=exp - time.time() if exp is not None else None)
+    return payload
     
 
     
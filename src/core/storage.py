@@ -1,24 +1,107 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
 import boto3
+from botocore.config import Config
+from fastapi import UploadFile
 from src.core.config import settings
-s3 = boto3.client(
-    "s3",
-    endpoint_url=settings.OBJECT_STORAGE_ENDPOINT,
-    aws_access_key_id=settings.OBJECT_STORAGE_ACCESS_KEY,
-    aws_secret_access_key=settings.OBJECT_STORAGE_SECRET_KEY,
-    region_name=settings.OBJECT_STORAGE_REGION,
+
+# boto3 is blocking, so every call runs in this pool; it is sized to the
+# client's connection pool so a worker never waits on a connection
+_storage_executor = ThreadPoolExecutor(
+    max_workers=settings.OBJECT_STORAGE_MAX_CONNECTIONS,
+    thread_name_prefix="storage",
 )
 
-async def upload_file_to_storage(file_key: str, file_content: bytes) -> str:
-    s3.upload_fileobj(
-        Fileobj=file_content,
-        Bucket=settings.OBJECT_STORAGE_BUCKET_NAME,
-        Key=file_key,
+
+@cache
+def get_s3_client():
+    # boto3 clients are thread-safe; one shared client reuses its pooled connections
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.OBJECT_STORAGE_ENDPOINT,
+        aws_access_key_id=settings.OBJECT_STORAGE_ACCESS_KEY,
+        aws_secret_access_key=settings.OBJECT_STORAGE_SECRET_KEY,
+        region_name=settings.OBJECT_STORAGE_REGION,
+        config=Config(max_pool_connections=settings.OBJECT_STORAGE_MAX_CONNECTIONS),
     )
+
+
+async def _s3_call(method: str, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_storage_executor, partial(getattr(get_s3_client(), method), **kwargs))
+
+
+async def upload_file_to_storage(file_key: str, file: UploadFile) -> str:
+    """Stream an upload to the bucket without blocking the event loop.
+
+    Bodies that fit in one part go up with a single PUT; larger ones use a
+    multipart upload with at most OBJECT_STORAGE_PART_CONCURRENCY parts in
+    flight, so memory stays bounded at part size x concurrency.
+    """
+    bucket = settings.OBJECT_STORAGE_BUCKET_NAME
+    part_size = settings.OBJECT_STORAGE_PART_SIZE
+    extra = {"ContentType": file.content_type} if file.content_type else {}
+
+    chunk = await file.read(part_size)
+    if len(chunk) < part_size:
+        await _s3_call("put_object", Bucket=bucket, Key=file_key, Body=chunk, **extra)
+        return file_key
+
+    upload = await _s3_call("create_multipart_upload", Bucket=bucket, Key=file_key, **extra)
+    upload_id = upload["UploadId"]
+    slots = asyncio.Semaphore(settings.OBJECT_STORAGE_PART_CONCURRENCY)
+
+    async def upload_part(part_number: int, body: bytes) -> dict:
+        try:
+            response = await _s3_call(
+                "upload_part",
+                Bucket=bucket,
+                Key=file_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+        finally:
+            slots.release()
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    tasks = []
+    try:
+        part_number = 1
+        while chunk:
+            await slots.acquire()
+            tasks.append(asyncio.create_task(upload_part(part_number, chunk)))
+            part_number += 1
+            chunk = await file.read(part_size)
+        parts = await asyncio.gather(*tasks)
+        await _s3_call(
+            "complete_multipart_upload",
+            Bucket=bucket,
+            Key=file_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await _s3_call("abort_multipart_upload", Bucket=bucket, Key=file_key, UploadId=upload_id)
+        raise
+    return file_key
+
+
+async def put_bytes_to_storage(file_key: str, data: bytes, content_type: str) -> str:
+    await _s3_call("put_object", Bucket=settings.OBJECT_STORAGE_BUCKET_NAME, Key=file_key, Body=data, ContentType=content_type)
     return file_key
 
+
+async def delete_file_from_storage(file_key: str) -> None:
+    await _s3_call("delete_object", Bucket=settings.OBJECT_STORAGE_BUCKET_NAME, Key=file_key)
+
+
 def url_generate(file_key: str) -> str:
     if settings.OBJECT_STORAGE_CUSTOM_DOMAIN:
         return f"{settings.OBJECT_STORAGE_CUSTOM_DOMAIN}/{file_key}"
     else:
         return f"{settings.OBJECT_STORAGE_ENDPOINT}/{settings.OBJECT_STORAGE_BUCKET_NAME}/{file_key}"
-    
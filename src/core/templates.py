@@ -0,0 +1,32 @@
+from pathlib import Path
+from typing import Any
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from src.core.config import settings
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+
+# one environment for every web router: templates compile once per process,
+# and the bytecode cache lets later workers and restarts skip parsing too
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(),
+    bytecode_cache=FileSystemBytecodeCache(settings.TEMPLATE_BYTECODE_CACHE_DIR),
+    # outside local development templates only change on deploy, so skip the
+    # per-render mtime check
+    auto_reload=settings.ENVIRONMENT == "local",
+)
+
+templates = Jinja2Templates(env=env)
+
+
+def render_template(name: str, context: dict[str, Any]) -> bytes:
+    return env.get_template(name).render(context).encode()
+
+
+def precompile_templates() -> None:
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+
+
+precompile_templates()
@@ -1,4 +1,4 @@
-from src.models import Users, Resources, Bookings, Facilities
+from src.models import Users, Resources, Bookings, Facilities, BookingSeries, BookingRollups, BOOKING_OVERLAP_CONSTRAINT
 from src.schemas import (
     UserSignup, 
     UserUpdate, 
@@ -11,18 +11,50 @@ from src.schemas import (
     ResourceResponse, 
     BookingCreate, 
     BookingUpdate, 
-    BookingResponse)
+    BookingResponse,
+    BookingSeriesCreate,
+    BookingExportParams,
+    FacilitySearchParams)
 from sqlalchemy.ext.asyncio import AsyncSession
+from collections.abc import AsyncIterator, Iterable, Sequence
+from functools import cache
 from uuid import UUID
 from sqlalchemy.future import select
-from src.core.security import hash_password, verify_password
-from sqlalchemy import or_, and_, Index, UniqueConstraint, CheckConstraint
-from datetime import datetime, timezone
-from src.utils import get_pagination
+from sqlalchemy.orm import aliased, joinedload, with_expression
+from src.core.security import hash_password_async, verify_password_async
+from src.core.response_cache import invalidate_cached_user
+from sqlalchemy import values, column, or_, and_, Index, UniqueConstraint, CheckConstraint, insert, update, literal, func, cast, Numeric, DateTime, Select, tuple_, case, exists, ColumnElement, literal_column, Row, Date, Integer, delete, text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, JSONB, insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+import uuid
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from src.utils import get_pagination, bounding_box, EARTH_RADIUS_KM, series_step, expand_series
+import math
 
 
 
 
+def paginate(query: Select, sort_columns: tuple, limit: int, offset: int, after: tuple | None = None, descending: bool = False) -> Select:
+    # keyset mode when `after` (the sort key of the last row seen) is given,
+    # so deep pages use an index range instead of scanning and skipping rows
+    query = query.order_by(*(column.desc() for column in sort_columns) if descending else sort_columns)
+    if after is not None:
+        key, last_seen = tuple_(*sort_columns), tuple_(*after)
+        query = query.where(key < last_seen if descending else key > last_seen)
+    else:
+        query = query.offset(offset)
+    return query.limit(limit)
+
+
+@cache
+def response_columns(model, schema, *extra: str) -> tuple:
+    # only the columns `schema` reads (plus sort keys), so list endpoints can
+    # skip ORM identity-map hydration and validate plain rows
+    table = model.__table__.c
+    return tuple(getattr(model, name) for name in dict.fromkeys((*schema.model_fields, *extra)) if name in table)
+
+
 async def get_user_by_id(db: AsyncSession, user_id: UUID) -> Users:
     return await db.get(Users, user_id)
 
@@ -35,7 +67,7 @@ async def create_user(db: AsyncSession, user_in: UserSignup) -> Users:
     profile_img_key = f'https://ui-avatars.com/api/?background=random&name={user_in.full_name}&size=128&rounded=true'
     new_user = Users(
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),  
+        hashed_password=await hash_password_async(user_in.password),  
         full_name=user_in.full_name,
         profile_image_key=profile_img_key
         
@@ -49,10 +81,11 @@ async def create_user(db: AsyncSession, user_in: UserSignup) -> Users:
 async def update_user(db: AsyncSession, user: Users, user_in: UserUpdate) -> Users:
     user_data = user_in.model_dump(exclude_unset=True)
     if "password" in user_data:
-        user_data["hashed_password"] = hash_password(user_data.pop("password"))
+        user_data["hashed_password"] = await hash_password_async(user_data.pop("password"))
     for field, value in user_data.items():
         setattr(user, field, value)
     await db.commit()
+    await invalidate_cached_user(str(user.id))
     await db.refresh(user)
     return user
 
@@ -61,22 +94,20 @@ async def update_user_me(db: AsyncSession, user: Users, user_in: UserUpdateMe) -
     for field, value in user_data.items():
         setattr(user, field, value)
     await db.commit()
+    await invalidate_cached_user(str(user.id))
     await db.refresh(user)
     return user
 
-async def get_all_users(db: AsyncSession, limit: int, offset: int) -> list[Users]:
-    result = await db.execute(select(Users).offset(offset).limit(limit))
-    return result.scalars().all()
-
 DUMMY_HASH = "$argon2id$v=19$m=16,t=2,p=1$WUZMTm9ydTVmcDRDbThCSg$8tIAZgUeWI+sbcOvj2f9Sw"
 
 
 async def authenticate_user(db: AsyncSession, email: str, password: str) -> Users:
     user = await get_user_by_email(db, email)
     if not user:
-        verify_password(password, DUMMY_HASH)
+        # keep the response time of unknown emails in line with real ones
+        await verify_password_async(password, DUMMY_HASH)
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user
 
@@ -94,17 +125,81 @@ async def create_facility(db: AsyncSession, facility_in: FacilityCreate):
         address=facility_in.address,
         open_at=facility_in.open_at,
         close_at=facility_in.close_at,
+        amenities=facility_in.amenities,
+        latitude=facility_in.latitude,
+        longitude=facility_in.longitude,
     )
     db.add(new_facility)
     await db.commit()
     await db.refresh(new_facility)
     return new_facility
 
+async def search_facilities(db: AsyncSession, params: FacilitySearchParams, limit: int, offset: int, after: tuple | None = None) -> list[Facilities]:
+    query = select(Facilities)
+    if params.city:
+        query = query.where(func.lower(Facilities.city) == params.city.lower())
+    if params.state:
+        query = query.where(func.lower(Facilities.state) == params.state.lower())
+    if params.amenities:
+        # jsonb @> so the GIN index on amenities does the filtering
+        query = query.where(Facilities.amenities.contains({amenity: True for amenity in params.amenities}))
+    if params.open_at:
+        # same rules as utils.get_opening_window: no hours = always open,
+        # close_at <= open_at = open past midnight
+        query = query.where(or_(
+            Facilities.open_at.is_(None),
+            and_(Facilities.open_at < Facilities.close_at, Facilities.open_at <= params.open_at, Facilities.close_at > params.open_at),
+            and_(Facilities.open_at >= Facilities.close_at, or_(Facilities.open_at <= params.open_at, Facilities.close_at > params.open_at)),
+        ))
+    if not params.q:
+        result = await db.execute(paginate(query, (Facilities.created_at, Facilities.id), limit, offset, after))
+        return result.scalars().all()
+    ts_query = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), params.q)
+    rank = func.ts_rank_cd(Facilities.search_vector, ts_query)
+    query = query.where(Facilities.search_vector.op("@@")(ts_query)).options(with_expression(Facilities.search_rank, rank))
+    # best match first; the rank is what the keyset cursor carries
+    result = await db.execute(paginate(query, (rank, Facilities.id), limit, offset, after, descending=True))
+    return result.scalars().all()
+
+def haversine_km(lat: float, lon: float, lat_column, lon_column) -> ColumnElement[float]:
+    d_lat = func.radians(lat_column - lat) / 2
+    d_lon = func.radians(lon_column - lon) / 2
+    a = func.power(func.sin(d_lat), 2) + math.cos(math.radians(lat)) * func.cos(func.radians(lat_column)) * func.power(func.sin(d_lon), 2)
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1.0)))
+
+async def get_facilities_nearby(db: AsyncSession, lat: float, lon: float, radius_km: float, limit: int) -> list[Facilities]:
+    # the bounding box is a range scan on ix_facility_lat_lon; the exact
+    # distance is only computed for the rows inside it
+    min_lat, max_lat, lon_ranges = bounding_box(lat, lon, radius_km)
+    distance = haversine_km(lat, lon, Facilities.latitude, Facilities.longitude)
+    result = await db.execute(
+        select(Facilities)
+        .where(
+            Facilities.latitude.between(min_lat, max_lat),
+            or_(*(Facilities.longitude.between(low, high) for low, high in lon_ranges)),
+            distance <= radius_km,
+        )
+        .options(with_expression(Facilities.distance_km, distance))
+        .order_by(distance, Facilities.id)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
 async def get_facility_by_id(db: AsyncSession, facility_id: UUID) -> Facilities:
     return await db.get(Facilities, facility_id)
 
-async def get_all_facilities(db: AsyncSession, limit: int, offset: int) -> list[Facilities]:
-    result = await db.execute(select(Facilities).offset(offset).limit(limit))
+async def get_facility_with_resources(db: AsyncSession, facility_id: UUID) -> Facilities | None:
+    # facility and resources in one round trip for the server-rendered venue page
+    result = await db.execute(select(Facilities).where(Facilities.id == facility_id).options(joinedload(Facilities.resources)))
+    return result.unique().scalars().first()
+
+async def get_all_facilities(db: AsyncSession, limit: int, offset: int, after: tuple | None = None) -> Sequence[Row]:
+    query = select(*response_columns(Facilities, FacilityResponse, "created_at"))
+    result = await db.execute(paginate(query, (Facilities.created_at, Facilities.id), limit, offset, after))
+    return result.all()
+
+async def get_resource_ids_by_facility_id(db: AsyncSession, facility_id: UUID) -> list[UUID]:
+    result = await db.execute(select(Resources.id).where(Resources.facility_id == facility_id))
     return result.scalars().all()
 
 async def delete_facility(db: AsyncSession, facility: Facilities):
@@ -119,6 +214,19 @@ async def update_facility(db: AsyncSession, facility: Facilities, facility_in: F
     await db.refresh(facility)
     return facility
 
+async def append_image(db: AsyncSession, model: type[Facilities] | type[Resources], obj_id: UUID, image: dict) -> Facilities | Resources | None:
+    # appended in SQL so concurrent uploads to the same row don't drop each other's entries
+    result = await db.execute(
+        update(model)
+        .where(model.id == obj_id)
+        .values(images=func.coalesce(model.images, func.jsonb_build_array()).op("||")(func.jsonb_build_array(literal(image, JSONB))))
+        .returning(model)
+        .execution_options(populate_existing=True)
+    )
+    obj = result.scalars().first()
+    await db.commit()
+    return obj
+
 async def create_resource(db: AsyncSession, resource_in: ResourceCreate):
     new_resource = Resources(
         facility_id=resource_in.facility_id,
@@ -134,8 +242,36 @@ async def create_resource(db: AsyncSession, resource_in: ResourceCreate):
 async def get_resource_by_id(db: AsyncSession, resource_id: UUID) -> Resources:
     return await db.get(Resources, resource_id)
 
-async def get_resources_by_facility_id(db: AsyncSession, facility_id: UUID, limit: int, offset: int) -> list[Resources]:
-    result = await db.execute(select(Resources).where(Resources.facility_id == facility_id).offset(offset).limit(limit))
+async def get_resource_with_price(db: AsyncSession, resource_id: UUID, start_time: datetime, end_time: datetime) -> Row | None:
+    # (resource, price of [start_time, end_time) on it, whether a series
+    # occurrence overlaps it). Takes the same shared lock as create_booking, so
+    # a series can't be created on the resource before the caller commits.
+    result = await db.execute(
+        select(
+            Resources,
+            booking_price(start_time, end_time, Resources.price_per_hour).label("price"),
+            series_overlap_exists(Resources.id, start_time, end_time).label("series_conflict"),
+        )
+        .where(Resources.id == resource_id)
+        .with_for_update(read=True, of=Resources)
+    )
+    return result.first()
+
+async def get_resources_by_ids(db: AsyncSession, facility_id: UUID, resource_ids: list[UUID]) -> list[Resources]:
+    # shared locks, held until the caller commits: see get_resource_with_price
+    result = await db.execute(
+        select(Resources)
+        .where(Resources.id.in_(resource_ids), Resources.facility_id == facility_id)
+        .order_by(Resources.id)
+        .with_for_update(read=True)
+    )
+    return result.scalars().all()
+
+async def get_resource_with_facility(db: AsyncSession, resource_id: UUID) -> Resources:
+    return await db.get(Resources, resource_id, options=[joinedload(Resources.facility)])
+
+async def get_resources_by_facility_id(db: AsyncSession, facility_id: UUID, limit: int, offset: int, after: tuple | None = None) -> list[Resources]:
+    result = await db.execute(paginate(select(Resources).where(Resources.facility_id == facility_id), (Resources.created_at, Resources.id), limit, offset, after))
     return result.scalars().all()
 
 async def delete_resource(db: AsyncSession, resource: Resources):
@@ -152,75 +288,474 @@ async def update_resource(db: AsyncSession, resource: Resources, resource_in: Re
     return resource
 
 
-async def get_all_resources(db: AsyncSession, limit: int, offset: int) -> list[Resources]:
-    result = await db.execute(select(Resources).offset(offset).limit(limit))
-    return result.scalars().all()
-
-
-async def create_booking(db: AsyncSession, booking_in: BookingCreate, user_id: UUID, total_price: float) -> Bookings:
-    new_booking = Bookings(
-        resource_id=booking_in.resource_id,
-        user_id=user_id,
-        start_time=booking_in.start_time,
-        end_time=booking_in.end_time,
-        total_price=total_price
-    )
-    db.add(new_booking)
+async def get_all_resources(db: AsyncSession, limit: int, offset: int, after: tuple | None = None) -> Sequence[Row]:
+    query = select(*response_columns(Resources, ResourceResponse, "created_at"))
+    result = await db.execute(paginate(query, (Resources.created_at, Resources.id), limit, offset, after))
+    return result.all()
+
+
+async def create_booking(db: AsyncSession, booking_in: BookingCreate, user_id: UUID, facility_id: UUID) -> Bookings | None:
+    # Single INSERT ... SELECT ... RETURNING: the resource/facility check, the price
+    # (booking_price), the overlap check (via the exclusion constraint) and the
+    # rollup update (_insert_with_rollups) all happen in one statement.
+    # Returns None when the resource does not belong to the facility or the slot
+    # falls on a recurring series occurrence; raises IntegrityError (see
+    # is_booking_conflict) when the slot is already taken by another booking.
+    # The shared lock on the resource row orders us against create_booking_series.
+    source = select(
+        literal(uuid.uuid4(), PG_UUID(as_uuid=True)),
+        Resources.id,
+        literal(user_id, PG_UUID(as_uuid=True)),
+        literal(booking_in.start_time, DateTime),
+        literal(booking_in.end_time, DateTime),
+        booking_price(booking_in.start_time, booking_in.end_time, Resources.price_per_hour),
+    ).where(
+        Resources.id == booking_in.resource_id,
+        Resources.facility_id == facility_id,
+        ~series_overlap_exists(Resources.id, booking_in.start_time, booking_in.end_time)
+    ).with_for_update(read=True, of=Resources)
+    stmt = insert(Bookings).from_select(["id", "resource_id", "user_id", "start_time", "end_time", "total_price"], source)
+    result = await db.execute(_insert_with_rollups(stmt))
+    new_booking = result.scalars().first()
     await db.commit()
-    await db.refresh(new_booking)
     return new_booking
 
-async def update_booking(db: AsyncSession, booking: Bookings, booking_in: BookingUpdate) -> Bookings:
-    booking_data = booking_in.model_dump(exclude_unset=True)
-    for field, value in booking_data.items():
-        setattr(booking, field, value)
+async def create_bookings(db: AsyncSession, bookings: list[dict]) -> list[Bookings]:
+    # one INSERT ... SELECT FROM (VALUES ...) RETURNING and one commit for the
+    # whole batch; joining the resources prices every row with booking_price
+    ids = [uuid.uuid4() for _ in bookings]
+    batch = values(
+        column("id", PG_UUID(as_uuid=True)),
+        column("resource_id", PG_UUID(as_uuid=True)),
+        column("user_id", PG_UUID(as_uuid=True)),
+        column("start_time", DateTime),
+        column("end_time", DateTime),
+        name="batch",
+    ).data([(booking_id, b["resource_id"], b["user_id"], b["start_time"], b["end_time"]) for booking_id, b in zip(ids, bookings)])
+    source = select(
+        batch.c.id,
+        batch.c.resource_id,
+        batch.c.user_id,
+        batch.c.start_time,
+        batch.c.end_time,
+        booking_price(batch.c.start_time, batch.c.end_time, Resources.price_per_hour),
+    ).join(Resources, Resources.id == batch.c.resource_id)
+    stmt = insert(Bookings).from_select(["id", "resource_id", "user_id", "start_time", "end_time", "total_price"], source)
+    result = await db.scalars(_insert_with_rollups(stmt))
+    # RETURNING order is unspecified; hand the rows back in request order
+    position = {booking_id: index for index, booking_id in enumerate(ids)}
+    new_bookings = sorted(result.all(), key=lambda booking: position[booking.id])
     await db.commit()
-    await db.refresh(booking)
-    return booking
-
+    return new_bookings
+
+async def update_booking(db: AsyncSession, booking: Bookings, booking_in: BookingUpdate, total_price: float) -> Bookings:
+    # One UPDATE ... RETURNING with the rollup deltas upserted next to it in a
+    # CTE, like create_booking; the deltas only apply if the UPDATE hit the row.
+    # Raises IntegrityError (see is_booking_conflict) on an overlap.
+    booking_data = {field: value for field, value in booking_in.model_dump(exclude_unset=True).items() if value is not None}
+    before = _rollup_entry(booking)
+    after = (
+        booking_data.get("resource_id", booking.resource_id),
+        booking_data.get("start_time", booking.start_time),
+        booking_data.get("end_time", booking.end_time),
+        total_price,
+    )
+    updated = (
+        update(Bookings)
+        .where(Bookings.id == booking.id)
+        .values(**booking_data, total_price=total_price)
+        .returning(*Bookings.__table__.c)
+        .cte("updated_booking")
+    )
+    stmt = select(aliased(Bookings, updated))
+    rows = _rollup_delta_rows(added=[after], removed=[before])
+    if rows:
+        deltas = values(*(column(name, type_) for name, type_ in ROLLUP_DELTA_COLUMNS), name="deltas").data(rows)
+        source = select(*deltas.c).where(exists(select(updated.c.id)))
+        stmt = stmt.add_cte(_rollup_upsert(source).cte("rollups"))
+    result = await db.execute(stmt.execution_options(populate_existing=True))
+    updated_booking = result.scalars().first()
+    await db.commit()
+    return updated_booking
+
+
+ROLLUP_COLUMNS = ("booking_count", "revenue", "booked_minutes")
+ROLLUP_DELTA_COLUMNS = (("resource_id", PG_UUID(as_uuid=True)), ("day", Date), ("booking_count", Integer), ("revenue", Numeric), ("booked_minutes", Integer))
+
+def _rollup_entry(booking) -> tuple[UUID, datetime, datetime, float]:
+    return booking.resource_id, booking.start_time, booking.end_time, booking.total_price
+
+def _series_rollup_entries(series: BookingSeries, window_start: datetime | None = None, window_end: datetime | None = None) -> list[tuple[UUID, datetime, datetime, float]]:
+    # occurrences count like bookings, on the day they start; with a window,
+    # only those starting inside it
+    window_start = window_start or series.first_start
+    occurrences = expand_series(
+        series.first_start,
+        series.first_end,
+        series_step(series.frequency, series.interval),
+        series.ends_at,
+        window_start,
+        window_end or series.ends_at,
+    )
+    return [(series.resource_id, start, end, series.price_per_occurrence) for start, end in occurrences if start >= window_start]
+
+def _booked_minutes(start_time, end_time) -> ColumnElement[int]:
+    return cast(func.round(func.extract("epoch", end_time - start_time) / 60), Integer)
+
+def _rollup_upsert(source: Select):
+    # source yields (resource_id, day, booking_count, revenue, booked_minutes)
+    # with one row per (resource_id, day)
+    stmt = pg_insert(BookingRollups).from_select(["resource_id", "day", *ROLLUP_COLUMNS], source)
+    return stmt.on_conflict_do_update(
+        index_elements=[BookingRollups.resource_id, BookingRollups.day],
+        set_={column: getattr(BookingRollups, column) + getattr(stmt.excluded, column) for column in ROLLUP_COLUMNS},
+    )
 
+def _insert_with_rollups(stmt) -> Select:
+    # WITH new_bookings AS (INSERT ... RETURNING *), rollups AS (INSERT INTO
+    # booking_rollups ... ON CONFLICT DO UPDATE) SELECT * FROM new_bookings:
+    # the rollup deltas ride in the same statement as the bookings themselves
+    new_bookings = stmt.returning(*Bookings.__table__.c).cte("new_bookings")
+    day = cast(new_bookings.c.start_time, Date)
+    deltas = select(
+        new_bookings.c.resource_id,
+        day,
+        func.count(),
+        func.sum(cast(new_bookings.c.total_price, Numeric)),
+        func.sum(_booked_minutes(new_bookings.c.start_time, new_bookings.c.end_time)),
+    ).group_by(new_bookings.c.resource_id, day)
+    return select(aliased(Bookings, new_bookings)).add_cte(_rollup_upsert(deltas).cte("rollups"))
+
+def _rollup_delta_rows(added: Iterable[tuple] = (), removed: Iterable[tuple] = ()) -> list[tuple]:
+    # (resource_id, day, booking_count, revenue, booked_minutes) per touched day,
+    # leaving out days where the changes cancel out
+    deltas: dict[tuple[UUID, date], list] = {}
+    for sign, entries in ((1, added), (-1, removed)):
+        for resource_id, start_time, end_time, total_price in entries:
+            delta = deltas.setdefault((resource_id, start_time.date()), [0, Decimal(0), 0])
+            delta[0] += sign
+            delta[1] += sign * Decimal(str(total_price))
+            delta[2] += sign * round((end_time - start_time).total_seconds() / 60)
+    return [(resource_id, day, *delta) for (resource_id, day), delta in deltas.items() if any(delta)]
+
+async def apply_booking_rollups(db: AsyncSession, added: Iterable[tuple] = (), removed: Iterable[tuple] = ()) -> None:
+    # folds booking writes into the daily rollups inside the caller's transaction,
+    # so the totals commit (or roll back) together with the bookings themselves
+    rows = _rollup_delta_rows(added, removed)
+    if not rows:
+        return
+    stmt = pg_insert(BookingRollups).values([dict(zip(("resource_id", "day", *ROLLUP_COLUMNS), row)) for row in rows])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[BookingRollups.resource_id, BookingRollups.day],
+        set_={column: getattr(BookingRollups, column) + getattr(stmt.excluded, column) for column in ROLLUP_COLUMNS},
+    ))
+
+async def rebuild_booking_rollups(db: AsyncSession, start: date, end: date) -> int:
+    # Recomputes the rollups for days in [start, end) from bookings and series
+    # occurrences. The lock makes concurrent booking and series writes wait at
+    # their rollup upsert until this pass commits: a write that committed
+    # earlier is in the recomputed totals, a later one adds its delta on top,
+    # so nothing is lost or counted twice.
+    await db.execute(text("LOCK TABLE booking_rollups IN SHARE ROW EXCLUSIVE MODE"))
+    await db.execute(delete(BookingRollups).where(BookingRollups.day >= start, BookingRollups.day < end))
+    window_start, window_end = datetime.combine(start, time.min), datetime.combine(end, time.min)
+    day = cast(Bookings.start_time, Date)
+    source = select(
+        Bookings.resource_id,
+        day,
+        func.count(),
+        func.sum(cast(Bookings.total_price, Numeric)),
+        func.sum(_booked_minutes(Bookings.start_time, Bookings.end_time)),
+    ).where(
+        Bookings.start_time >= window_start,
+        Bookings.start_time < window_end,
+    ).group_by(Bookings.resource_id, day)
+    await db.execute(insert(BookingRollups).from_select(["resource_id", "day", *ROLLUP_COLUMNS], source))
+    series_list = await db.scalars(select(BookingSeries).where(BookingSeries.first_start < window_end, BookingSeries.ends_at > window_start))
+    await apply_booking_rollups(db, added=[entry for series in series_list for entry in _series_rollup_entries(series, window_start, window_end)])
+    rows = await db.scalar(select(func.count()).select_from(BookingRollups).where(BookingRollups.day >= start, BookingRollups.day < end))
+    await db.commit()
+    return rows
+
+async def get_booking_day_range(db: AsyncSession) -> tuple[date, date] | None:
+    # least/greatest skip NULLs, so either table may be empty
+    result = await db.execute(select(
+        func.least(select(func.min(Bookings.start_time)).scalar_subquery(), select(func.min(BookingSeries.first_start)).scalar_subquery()),
+        func.greatest(select(func.max(Bookings.start_time)).scalar_subquery(), select(func.max(BookingSeries.ends_at)).scalar_subquery()),
+    ))
+    first, last = result.one()
+    return (first.date(), last.date()) if first is not None else None
+
+async def get_facility_rollups(db: AsyncSession, facility_id: UUID, granularity: str, start: date, end: date) -> Sequence[Row]:
+    # inlined so the SELECT and GROUP BY expressions are identical
+    period = cast(func.date_trunc(literal(granularity, literal_execute=True), BookingRollups.day), Date).label("period_start")
+    result = await db.execute(
+        select(
+            BookingRollups.resource_id,
+            period,
+            *(func.sum(getattr(BookingRollups, column)).label(column) for column in ROLLUP_COLUMNS),
+        )
+        .join(Resources, Resources.id == BookingRollups.resource_id)
+        .where(Resources.facility_id == facility_id, BookingRollups.day >= start, BookingRollups.day < end)
+        .group_by(BookingRollups.resource_id, period)
+        .order_by(BookingRollups.resource_id, period)
+    )
+    return result.all()
+
+
+
+
+def _timestamp(value) -> ColumnElement[datetime]:
+    return value if isinstance(value, ColumnElement) else literal(value, DateTime)
+
+def booking_price(start_time, end_time, price_per_hour) -> ColumnElement[Decimal]:
+    # The one pricing rule for bookings, batches, updates and series, worked out
+    # by Postgres in numeric so a half cent always rounds the same way (up).
+    seconds = cast(func.extract("epoch", _timestamp(end_time) - _timestamp(start_time)), Numeric)
+    return func.round(seconds * price_per_hour / 3600, 2)
+
+def is_booking_conflict(exc: IntegrityError) -> bool:
+    # 23P01 = exclusion_violation
+    return getattr(exc.orig, "sqlstate", None) == "23P01" or BOOKING_OVERLAP_CONSTRAINT in str(exc.orig)
+
+def series_overlap_exists(resource_id, start_time: datetime, end_time: datetime) -> ColumnElement[bool]:
+    # Occurrences of a series never overlap each other, so only the first one
+    # ending after start_time can intersect [start_time, end_time). Its index k
+    # is computed in closed form, which keeps this a single indexed lookup no
+    # matter how long the series is.
+    step = BookingSeries.interval * case((BookingSeries.frequency == "weekly", 7 * 86400), else_=86400)
+    duration = func.extract("epoch", BookingSeries.first_end - BookingSeries.first_start)
+    since_start = func.extract("epoch", literal(start_time, DateTime) - BookingSeries.first_start)
+    k = func.greatest(0, func.floor((since_start - duration) / step) + 1)
+    occurrence_start = BookingSeries.first_start + func.make_interval(0, 0, 0, 0, 0, 0, k * step)
+    query = select(BookingSeries.id).where(
+        BookingSeries.resource_id == resource_id,
+        BookingSeries.first_start < end_time,
+        BookingSeries.ends_at > start_time,
+        occurrence_start < end_time
+    )
+    return exists(query)
 
+async def check_series_conflict(db: AsyncSession, resource_id: UUID, start_time: datetime, end_time: datetime) -> bool:
+    result = await db.execute(select(series_overlap_exists(resource_id, start_time, end_time)))
+    return result.scalar()
 
 async def check_booking_conflict(db: AsyncSession, resource_id: UUID, start_time: datetime, end_time: datetime, exclude_booking_id: UUID | None = None) -> bool:
-    query = select(Bookings).where(
+    query = select(Bookings.id).where(
         Bookings.resource_id == resource_id,
         Bookings.start_time < end_time,
         Bookings.end_time > start_time
     )
     if exclude_booking_id:
         query = query.where(Bookings.id != exclude_booking_id)
-    result = await db.execute(query)
-    return result.scalars().first() is not None
+    result = await db.execute(query.limit(1))
+    return result.scalar() is not None
+
+async def get_booked_intervals_by_resource_ids(db: AsyncSession, resource_ids: list[UUID], window_start: datetime, window_end: datetime) -> list[tuple[UUID, datetime, datetime]]:
+    result = await db.execute(
+        select(Bookings.resource_id, Bookings.start_time, Bookings.end_time)
+        .where(
+            Bookings.resource_id.in_(resource_ids),
+            Bookings.start_time < window_end,
+            Bookings.end_time > window_start
+        )
+        .order_by(Bookings.resource_id, Bookings.start_time)
+    )
+    return result.tuples().all()
+
+def _changed_at(model) -> ColumnElement[datetime]:
+    # updated_at is only set by the first UPDATE
+    return func.coalesce(model.updated_at, model.created_at)
+
+async def get_booking_version(db: AsyncSession, booking_id: UUID, user_id: UUID | None = None) -> datetime | None:
+    query = select(_changed_at(Bookings)).where(Bookings.id == booking_id)
+    if user_id is not None:
+        query = query.where(Bookings.user_id == user_id)
+    return await db.scalar(query)
+
+async def get_bookings_version(db: AsyncSession, limit: int, offset: int, after: tuple | None = None, user_id: UUID | None = None, resource_id: UUID | None = None, facility_id: UUID | None = None) -> Sequence[Row]:
+    # (id, changed_at) of only the rows on the requested page: the same index
+    # range as the page query itself, so it costs the same at any depth and
+    # never aggregates over the whole table
+    query = select(Bookings.id, _changed_at(Bookings))
+    if user_id is not None:
+        query = query.where(Bookings.user_id == user_id)
+    if resource_id is not None:
+        query = query.where(Bookings.resource_id == resource_id)
+    if facility_id is not None:
+        query = query.join(Resources, Resources.id == Bookings.resource_id).where(Resources.facility_id == facility_id)
+    result = await db.execute(paginate(query, (Bookings.start_time, Bookings.id), limit, offset, after))
+    return result.all()
+
+async def get_resources_version(db: AsyncSession, limit: int, offset: int, after: tuple | None = None) -> Sequence[Row]:
+    result = await db.execute(paginate(select(Resources.id, _changed_at(Resources)), (Resources.created_at, Resources.id), limit, offset, after))
+    return result.all()
 
 async def get_booking_by_id(db: AsyncSession, booking_id: UUID) -> Bookings:
     return await db.get(Bookings, booking_id)
 
-async def get_bookings_by_user_id(db: AsyncSession, user_id: UUID, limit: int, offset: int) -> list[Bookings]:
-    result = await db.execute(select(Bookings).where(Bookings.user_id == user_id).offset(offset).limit(limit))
+def _booking_expand_options(expand: frozenset[str]) -> list:
+    # many-to-one all the way, so joinedload adds columns but never rows and
+    # LIMIT/keyset paging stay correct; the whole page is still one query
+    if "facility" in expand:
+        return [joinedload(Bookings.resource).joinedload(Resources.facility)]
+    if "resource" in expand:
+        return [joinedload(Bookings.resource)]
+    return []
+
+async def get_bookings_by_user_id(db: AsyncSession, user_id: UUID, limit: int, offset: int, after: tuple | None = None, expand: frozenset[str] = frozenset()) -> list[Bookings]:
+    query = select(Bookings).where(Bookings.user_id == user_id).options(*_booking_expand_options(expand))
+    result = await db.execute(paginate(query, (Bookings.start_time, Bookings.id), limit, offset, after))
     return result.scalars().all()
 
-async def get_bookings_by_resource_id(db: AsyncSession, resource_id: UUID, limit: int, offset: int) -> list[Bookings]:
-    result = await db.execute(select(Bookings).where(Bookings.resource_id == resource_id).offset(offset).limit(limit))
+async def get_bookings_by_resource_id(db: AsyncSession, resource_id: UUID, limit: int, offset: int, after: tuple | None = None) -> list[Bookings]:
+    result = await db.execute(paginate(select(Bookings).where(Bookings.resource_id == resource_id), (Bookings.start_time, Bookings.id), limit, offset, after))
     return result.scalars().all()
 
+async def get_booked_intervals_by_resource_id(db: AsyncSession, resource_id: UUID, window_start: datetime, window_end: datetime) -> list[tuple[datetime, datetime]]:
+    # range scan on ix_booking_resource_start_end, sorted for the free-slot sweep
+    result = await db.execute(
+        select(Bookings.start_time, Bookings.end_time)
+        .where(
+            Bookings.resource_id == resource_id,
+            Bookings.start_time < window_end,
+            Bookings.end_time > window_start
+        )
+        .order_by(Bookings.start_time)
+    )
+    return result.tuples().all()
+
 
 async def delete_booking(db: AsyncSession, booking: Bookings):
+    await apply_booking_rollups(db, removed=[_rollup_entry(booking)])
     await db.delete(booking)
     await db.commit()
 
 
-async def get_all_bookings(db: AsyncSession, limit: int, offset: int) -> list[Bookings]:
-    result = await db.execute(select(Bookings).offset(offset).limit(limit))
+async def get_all_bookings(db: AsyncSession, limit: int, offset: int, after: tuple | None = None) -> Sequence[Row]:
+    query = select(*response_columns(Bookings, BookingResponse, "start_time"))
+    result = await db.execute(paginate(query, (Bookings.start_time, Bookings.id), limit, offset, after))
+    return result.all()
+
+
+async def stream_bookings(db: AsyncSession, params: BookingExportParams, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+    # server-side cursor: rows arrive batch_size at a time, so memory stays flat
+    # whatever the size of the export
+    query = select(*response_columns(Bookings, BookingResponse)).order_by(Bookings.start_time, Bookings.id)
+    if params.facility_id is not None:
+        query = query.join(Resources, Resources.id == Bookings.resource_id).where(Resources.facility_id == params.facility_id)
+    if params.resource_id is not None:
+        query = query.where(Bookings.resource_id == params.resource_id)
+    if params.window_start is not None:
+        query = query.where(Bookings.start_time >= params.window_start)
+    if params.window_end is not None:
+        query = query.where(Bookings.start_time < params.window_end)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+async def get_bookings_by_facility_id(db: AsyncSession, facility_id: UUID, limit: int, offset: int, after: tuple | None = None, expand: frozenset[str] = frozenset()) -> list[Bookings]:
+    query = select(Bookings).join(Resources).where(Resources.facility_id == facility_id).options(*_booking_expand_options(expand))
+    result = await db.execute(paginate(query, (Bookings.start_time, Bookings.id), limit, offset, after))
     return result.scalars().all()
 
+async def get_booked_intervals_by_facility_id(db: AsyncSession, facility_id: UUID, window_start: datetime, window_end: datetime) -> list[tuple[UUID, str, datetime | None, datetime | None]]:
+    # one row per (resource, booking) overlapping the window; resources without
+    # bookings still come back once with NULL times via the outer join
+    result = await db.execute(
+        select(Resources.id, Resources.name, Bookings.start_time, Bookings.end_time)
+        .outerjoin(
+            Bookings,
+            and_(
+                Bookings.resource_id == Resources.id,
+                Bookings.start_time < window_end,
+                Bookings.end_time > window_start
+            )
+        )
+        .where(Resources.facility_id == facility_id)
+        .order_by(Resources.name, Resources.id, Bookings.start_time)
+    )
+    return result.tuples().all()
 
-async def get_bookings_by_facility_id(db: AsyncSession, facility_id: UUID, limit: int, offset: int) -> list[Bookings]:
+
+async def get_booked_intervals_by_facility_ids(db: AsyncSession, facility_ids: list[UUID], window_start: datetime, window_end: datetime) -> list[tuple[UUID, UUID, datetime | None, datetime | None]]:
+    # same shape as get_booked_intervals_by_facility_id, for several facilities at once
     result = await db.execute(
-        select(Bookings).join(Resources).where(Resources.facility_id == facility_id).offset(offset).limit(limit)
+        select(Resources.facility_id, Resources.id, Bookings.start_time, Bookings.end_time)
+        .outerjoin(
+            Bookings,
+            and_(
+                Bookings.resource_id == Resources.id,
+                Bookings.start_time < window_end,
+                Bookings.end_time > window_start
+            )
+        )
+        .where(Resources.facility_id.in_(facility_ids))
+        .order_by(Resources.facility_id, Resources.name, Resources.id, Bookings.start_time)
     )
-    return result.scalars().all()
+    return result.tuples().all()
 
 
+async def lock_resource(db: AsyncSession, resource_id: UUID, facility_id: UUID, start_time: datetime, end_time: datetime) -> Row | None:
+    # serializes series creation per resource (and against create_booking, which
+    # takes a shared lock on the same row); also returns the price of one
+    # [start_time, end_time) occurrence
+    result = await db.execute(
+        select(Resources, booking_price(start_time, end_time, Resources.price_per_hour).label("price"))
+        .where(Resources.id == resource_id, Resources.facility_id == facility_id)
+        .with_for_update(of=Resources)
+    )
+    return result.first()
+
+async def create_booking_series(db: AsyncSession, series_in: BookingSeriesCreate, user_id: UUID, ends_at: datetime, price_per_occurrence: float) -> BookingSeries:
+    new_series = BookingSeries(
+        resource_id=series_in.resource_id,
+        user_id=user_id,
+        frequency=series_in.frequency,
+        interval=series_in.interval,
+        first_start=series_in.start_time,
+        first_end=series_in.end_time,
+        count=series_in.count,
+        until=series_in.until,
+        ends_at=ends_at,
+        price_per_occurrence=price_per_occurrence
+    )
+    db.add(new_series)
+    await apply_booking_rollups(db, added=_series_rollup_entries(new_series))
+    await db.commit()
+    return new_series
+
+async def get_booking_series_by_id(db: AsyncSession, series_id: UUID) -> BookingSeries:
+    return await db.get(BookingSeries, series_id)
+
+async def delete_booking_series(db: AsyncSession, series: BookingSeries):
+    await apply_booking_rollups(db, removed=_series_rollup_entries(series))
+    await db.delete(series)
+    await db.commit()
 
+async def get_series_by_user_id(db: AsyncSession, user_id: UUID, limit: int, offset: int, after: tuple | None = None) -> list[BookingSeries]:
+    result = await db.execute(paginate(select(BookingSeries).where(BookingSeries.user_id == user_id), (BookingSeries.first_start, BookingSeries.id), limit, offset, after))
+    return result.scalars().all()
 
+async def get_series_by_resource_ids(db: AsyncSession, resource_ids: list[UUID], window_start: datetime, window_end: datetime) -> list[BookingSeries]:
+    result = await db.execute(
+        select(BookingSeries).where(
+            BookingSeries.resource_id.in_(resource_ids),
+            BookingSeries.first_start < window_end,
+            BookingSeries.ends_at > window_start
+        )
+    )
+    return result.scalars().all()
 
+async def get_series_by_facility_id(db: AsyncSession, facility_id: UUID, window_start: datetime, window_end: datetime) -> list[BookingSeries]:
+    result = await db.execute(
+        select(BookingSeries)
+        .join(Resources, BookingSeries.resource_id == Resources.id)
+        .where(
+            Resources.facility_id == facility_id,
+            BookingSeries.first_start < window_end,
+            BookingSeries.ends_at > window_start
+        )
+    )
+    return result.scalars().all()
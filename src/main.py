@@ -1,18 +1,21 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
 from fastapi.responses import HTMLResponse 
 from src.router.main import router as api_router 
+from src.core.templates import templates
+from src.core.config import settings
+from src.router.depandency import ReadYourWritesMiddleware
 
 app = FastAPI()
 
+if settings.DB_REPLICA_URL:
+    app.add_middleware(ReadYourWritesMiddleware)
+
 app.include_router(api_router)
 
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
 
-templates = Jinja2Templates(directory="src/templates") 
-
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("pages/home.html", {"request": request})
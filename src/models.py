@@ -1,10 +1,12 @@
 from src.core.db import Base
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Float, String, Integer, UniqueConstraint, Index, CheckConstraint, and_, or_, TIME, ForeignKey, DateTime, Boolean, func, TIMESTAMP
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Float, String, Integer, UniqueConstraint, Index, CheckConstraint, and_, or_, TIME, ForeignKey, DateTime, Boolean, func, TIMESTAMP, Computed, Date, Numeric
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSRANGE, TSVECTOR, ExcludeConstraint, Range
 import uuid
-from datetime import time, datetime
-from sqlalchemy.orm import relationship
+from datetime import time, datetime, date
+from decimal import Decimal
+from typing import Any
+from sqlalchemy.orm import relationship, query_expression
 from datetime import datetime, timezone, timedelta
 
 
@@ -28,6 +30,13 @@ class Users(Base):
 
 
 
+FACILITY_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(city, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(address, '')), 'C')"
+)
+
+
 class Facilities(Base):
     __tablename__ = "facilities"
 
@@ -38,10 +47,18 @@ class Facilities(Base):
     address: Mapped[str] = mapped_column(String(255))
     open_at: Mapped[ time | None] = mapped_column(TIME)
     close_at: Mapped[ time | None] = mapped_column(TIME)
-    images: Mapped[list[str] | None] = mapped_column(JSONB)
+    images: Mapped[list[dict[str, Any]] | None] = mapped_column(JSONB)
     amenities: Mapped[dict | None] = mapped_column(JSONB)
+    latitude: Mapped[float | None] = mapped_column(Float)
+    longitude: Mapped[float | None] = mapped_column(Float)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True), onupdate=func.now())
+    # name weighs more than city, city more than address; 'simple' since venue names aren't English
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, Computed(FACILITY_SEARCH_VECTOR, persisted=True), deferred=True)
+    # only populated by search queries (see crud.search_facilities)
+    search_rank: Mapped[float | None] = query_expression()
+    # only populated by proximity queries (see crud.get_facilities_nearby)
+    distance_km: Mapped[float | None] = query_expression()
     resources: Mapped[list["Resources"]] = relationship("Resources", back_populates="facility")
 
 
@@ -49,6 +66,17 @@ class Facilities(Base):
     __table_args__ = (
         UniqueConstraint('name', 'city', name='uix_facility_name_city'),
         Index('ix_facility_name_city_state', 'name', 'city', 'state'),
+        Index('ix_facility_created_id', 'created_at', 'id'),
+        Index('ix_facility_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_facility_amenities', 'amenities', postgresql_using='gin', postgresql_ops={'amenities': 'jsonb_path_ops'}),
+        Index('ix_facility_city_state_lower', func.lower(city), func.lower(state)),
+        Index('ix_facility_lat_lon', 'latitude', 'longitude'),
+        CheckConstraint(
+        or_(
+            and_(latitude.is_(None), longitude.is_(None)),
+            and_(latitude.between(-90, 90), longitude.between(-180, 180))
+        ),
+        name="facility_coordinates_valid" ),
         UniqueConstraint('name', 'address', name='uix_name_address'),
         CheckConstraint(
         or_(
@@ -69,16 +97,21 @@ class Resources(Base):
     description: Mapped[str | None] = mapped_column(String(500))
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True), onupdate=func.now())
-    images: Mapped[list[str] | None] = mapped_column(JSONB)
+    images: Mapped[list[dict[str, Any]] | None] = mapped_column(JSONB)
     bookings: Mapped[list["Bookings"]] = relationship("Bookings", back_populates="resource")
     facility = relationship("Facilities", back_populates="resources")
     __table_args__ = (
         UniqueConstraint('facility_id', 'name', name='uix_resource_facility_name'),
         Index('ix_resource_facility_name', 'facility_id', 'name'),
+        Index('ix_resource_created_id', 'created_at', 'id'),
+        Index('ix_resource_facility_created_id', 'facility_id', 'created_at', 'id'),
     )
 
 
 
+BOOKING_OVERLAP_CONSTRAINT = "excl_booking_resource_period"
+
+
 class Bookings(Base):
     __tablename__ = "bookings"
 
@@ -88,17 +121,70 @@ class Bookings(Base):
     start_time: Mapped[datetime] = mapped_column(DateTime, index=True)
     end_time: Mapped[datetime] = mapped_column(DateTime, index=True)
     total_price: Mapped[float] = mapped_column(Float)
+    # half-open [start_time, end_time) so back-to-back bookings don't collide
+    period: Mapped[Range[datetime] | None] = mapped_column(TSRANGE, Computed("tsrange(start_time, end_time, '[)')", persisted=True))
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True), onupdate=func.now())
     resource: Mapped["Resources"] = relationship("Resources", back_populates="bookings")
     user: Mapped["Users"] = relationship("Users", back_populates="bookings")
+    __mapper_args__ = {"eager_defaults": True}
     __table_args__ = (
         Index('ix_booking_resource_start_end', 'resource_id', 'start_time', 'end_time'),
+        Index('ix_booking_start_id', 'start_time', 'id'),
+        Index('ix_booking_user_start_id', 'user_id', 'start_time', 'id'),
+        ExcludeConstraint(
+            ('resource_id', '='),
+            ('period', '&&'),
+            name=BOOKING_OVERLAP_CONSTRAINT,
+            using='gist',
+        ),
     )
 
 
+class BookingRollups(Base):
+    __tablename__ = "booking_rollups"
+
+    # per-resource daily totals of Bookings, kept in step by the crud write paths
+    # (see apply_booking_rollups) and rebuilt by src.backfill_rollups; a booking
+    # counts towards the day its start_time falls on
+    resource_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("resources.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    booking_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=0, server_default="0")
+    booked_minutes: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    __table_args__ = (
+        Index('ix_booking_rollups_day', 'day'),
+    )
 
 
 
 
 
+
+
+class BookingSeries(Base):
+    __tablename__ = "booking_series"
+
+    # a recurring booking stored as its rule; occurrences are expanded on read
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    resource_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("resources.id"), index=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
+    frequency: Mapped[str] = mapped_column(String(10))
+    interval: Mapped[int] = mapped_column(Integer, default=1)
+    first_start: Mapped[datetime] = mapped_column(DateTime)
+    first_end: Mapped[datetime] = mapped_column(DateTime)
+    count: Mapped[int | None] = mapped_column(Integer)
+    until: Mapped[datetime | None] = mapped_column(DateTime)
+    # end of the last occurrence, derived from count/until so range filters can use an index
+    ends_at: Mapped[datetime] = mapped_column(DateTime)
+    price_per_occurrence: Mapped[float] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(timezone=True), onupdate=func.now())
+    resource: Mapped["Resources"] = relationship("Resources")
+    user: Mapped["Users"] = relationship("Users")
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index('ix_booking_series_resource_span', 'resource_id', 'first_start', 'ends_at'),
+        CheckConstraint("frequency IN ('daily', 'weekly')", name="booking_series_frequency"),
+        CheckConstraint("count IS NOT NULL OR until IS NOT NULL", name="booking_series_bounded"),
+    )
@@ -1,23 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from src.router.depandency import SessionDep, get_current_active_user, get_current_active_superuser
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from src.router.depandency import SessionDep, ReadSessionDep, get_current_active_user, get_current_active_superuser
 from src.service import (
     create_booking_service,
+    create_bookings_batch_service,
+    create_booking_series_service,
+    get_booking_series_service,
+    get_booking_series_occurrences_service,
+    get_booking_series_by_user_id_service,
+    delete_booking_series_service,
     get_booking_by_id_service,
+    get_booking_validators_service,
+    get_bookings_validators_service,
     delete_booking_service,
     update_booking_service,
     get_bookings_by_user_id_service,
     get_bookings_by_resource_id_service,
     get_bookings_by_facility_id_service,
-    get_all_bookings_service
+    get_all_bookings_service,
+    export_bookings_service
 )
-from src.schemas import BookingCreate, BookingResponse, BookingUpdate, PaginationParams, UserResponse
+from src.schemas import BookingCreate, BookingResponse, BookingExpandedResponse, BookingUpdate, BookingBatchCreate, BookingBatchResponse, BookingSeriesCreate, BookingSeriesResponse, BookingExportParams, TimeInterval, PaginationParams, UserResponse, CursorPage
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID  
 from typing import Annotated
-from src.utils import get_pagination    
+from datetime import datetime
+from src.utils import get_pagination, get_booking_expand, get_booking_export_params
+from src.core.response_cache import conditional_get
+from src.core.responses import validated_json
 
 router = APIRouter(prefix="/api/v1/bookings", tags=["bookings"])
 
+BookingList = list[BookingResponse] | CursorPage[BookingResponse]
+BookingExpandedList = list[BookingExpandedResponse] | CursorPage[BookingExpandedResponse]
+BookingSeriesList = list[BookingSeriesResponse] | CursorPage[BookingSeriesResponse]
+
 @router.post("/{facility_id}", response_model=BookingResponse, status_code=201)
 async def create_booking(
     booking_in: BookingCreate,
@@ -27,9 +44,62 @@ async def create_booking(
 ):
     return await create_booking_service(db=db, booking_in=booking_in, user_id=current_user.id, facility_id=facility_id)
 
+@router.post("/{facility_id}/batch", response_model=BookingBatchResponse, status_code=201)
+async def create_bookings_batch(
+    batch_in: BookingBatchCreate,
+    facility_id: UUID,
+    db: SessionDep,
+    current_user: Annotated[UserResponse, Depends(get_current_active_user)]
+):
+    return await create_bookings_batch_service(db=db, batch_in=batch_in, user_id=current_user.id, facility_id=facility_id)
+
+@router.post("/{facility_id}/series", response_model=BookingSeriesResponse, status_code=201)
+async def create_booking_series(
+    series_in: BookingSeriesCreate,
+    facility_id: UUID,
+    db: SessionDep,
+    current_user: Annotated[UserResponse, Depends(get_current_active_user)]
+):
+    return await create_booking_series_service(db=db, series_in=series_in, user_id=current_user.id, facility_id=facility_id)
+
+@router.get("/series/{series_id}", response_model=BookingSeriesResponse)
+async def get_booking_series(series_id: UUID, db: SessionDep, current_user: Annotated[UserResponse, Depends(get_current_active_user)]):
+    return await get_booking_series_service(db=db, series_id=series_id, current_user=current_user)
+
+@router.get("/series/{series_id}/occurrences", response_model=list[TimeInterval])
+async def get_booking_series_occurrences(
+    series_id: UUID,
+    db: SessionDep,
+    current_user: Annotated[UserResponse, Depends(get_current_active_user)],
+    window_start: Annotated[datetime | None, Query(alias="from")] = None,
+    window_end: Annotated[datetime | None, Query(alias="to")] = None
+):
+    return await get_booking_series_occurrences_service(db=db, series_id=series_id, current_user=current_user, window_start=window_start, window_end=window_end)
+
+@router.delete("/series/{series_id}", status_code=204)
+async def delete_booking_series(series_id: UUID, db: SessionDep, current_user: Annotated[UserResponse, Depends(get_current_active_user)]):
+    await delete_booking_series_service(db=db, series_id=series_id, current_user=current_user)
+    return None
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# the full ledger, unpaginated, streamed as it is read
+@router.get("/export", response_class=StreamingResponse)
+async def export_bookings(
+    params: Annotated[BookingExportParams, Depends(get_booking_export_params)],
+    db: ReadSessionDep,
+    current_user: Annotated[UserResponse, Depends(get_current_active_superuser)]
+):
+    return StreamingResponse(
+        export_bookings_service(db=db, params=params),
+        media_type=EXPORT_MEDIA_TYPES[params.format],
+        headers={"Content-Disposition": f'attachment; filename="bookings.{params.format}"'},
+    )
+
 @router.get("/{booking_id}", response_model=BookingResponse)
-async def get_booking_by_id(booking_id: UUID, db: SessionDep, current_user: Annotated[UserResponse, Depends(get_current_active_user)]):
-    return await get_booking_by_id_service(db=db, booking_id=booking_id, current_user=current_user)
+async def get_booking_by_id(booking_id: UUID, request: Request, response: Response, db: SessionDep, current_user: Annotated[UserResponse, Depends(get_current_active_user)]):
+    validators = await get_booking_validators_service(db=db, booking_id=booking_id, current_user=current_user)
+    return await conditional_get(request, response, validators, lambda: get_booking_by_id_service(db=db, booking_id=booking_id, current_user=current_user))
 
 @router.put("/{booking_id}", response_model=BookingResponse)
 async def update_booking(
@@ -59,40 +129,72 @@ async def delete_booking(
     await delete_booking_service(db=db, booking_id=booking_id)
     return None
 
-@router.get("/user/{user_id}", response_model=list[BookingResponse])
+# expanded objects are omitted entirely (not null) unless asked for
+@router.get("/user/{user_id}", response_model=BookingExpandedList, response_model_exclude_unset=True)
 async def get_bookings_by_user_id(
     user_id: UUID,
+    request: Request,
+    response: Response,
     pagination: Annotated[PaginationParams, Depends(get_pagination)],
-    db: SessionDep,
+    expand: Annotated[frozenset[str], Depends(get_booking_expand)],
+    db: ReadSessionDep,
+    current_user: Annotated[UserResponse, Depends(get_current_active_user)]
+):
+    if user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    validators = await get_bookings_validators_service(db=db, pagination=pagination, user_id=user_id, expand=expand)
+    result = await conditional_get(request, response, validators, lambda: get_bookings_by_user_id_service(db=db, user_id=user_id, pagination=pagination, expand=expand))
+    return validated_json(result, BookingExpandedList if expand else BookingList, response, exclude_unset=True)
+
+# recurring bookings are rules rather than rows, so they are listed here and
+# not in /user/{user_id}; /series/{series_id}/occurrences expands one
+@router.get("/user/{user_id}/series", response_model=BookingSeriesList)
+async def get_booking_series_by_user_id(
+    user_id: UUID,
+    pagination: Annotated[PaginationParams, Depends(get_pagination)],
+    db: ReadSessionDep,
     current_user: Annotated[UserResponse, Depends(get_current_active_user)]
 ):
     if user_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Forbidden")
-    return await get_bookings_by_user_id_service(db=db, user_id=user_id, pagination=pagination)
+    return validated_json(await get_booking_series_by_user_id_service(db=db, user_id=user_id, pagination=pagination), BookingSeriesList)
 
-@router.get("/resource/{resource_id}", response_model=list[BookingResponse])
+@router.get("/resource/{resource_id}", response_model=BookingList)
 async def get_bookings_by_resource_id(
     resource_id: UUID,
+    request: Request,
+    response: Response,
     pagination: Annotated[PaginationParams, Depends(get_pagination)],
-    db: SessionDep,
+    db: ReadSessionDep,
     current_user: Annotated[UserResponse, Depends(get_current_active_user)]
 ):
-    return await get_bookings_by_resource_id_service(db=db, resource_id=resource_id, pagination=pagination)
+    validators = await get_bookings_validators_service(db=db, pagination=pagination, resource_id=resource_id)
+    result = await conditional_get(request, response, validators, lambda: get_bookings_by_resource_id_service(db=db, resource_id=resource_id, pagination=pagination))
+    return validated_json(result, BookingList, response)
 
-@router.get("/facility/{facility_id}", response_model=list[BookingResponse])
+@router.get("/facility/{facility_id}", response_model=BookingExpandedList, response_model_exclude_unset=True)
 async def get_bookings_by_facility_id(
     facility_id: UUID,
+    request: Request,
+    response: Response,
     pagination: Annotated[PaginationParams, Depends(get_pagination)],
-    db: SessionDep,
+    expand: Annotated[frozenset[str], Depends(get_booking_expand)],
+    db: ReadSessionDep,
     current_user: Annotated[UserResponse, Depends(get_current_active_user)]
 ):
-    return await get_bookings_by_facility_id_service(db=db, facility_id=facility_id, pagination=pagination)
+    validators = await get_bookings_validators_service(db=db, pagination=pagination, facility_id=facility_id, expand=expand)
+    result = await conditional_get(request, response, validators, lambda: get_bookings_by_facility_id_service(db=db, facility_id=facility_id, pagination=pagination, expand=expand))
+    return validated_json(result, BookingExpandedList if expand else BookingList, response, exclude_unset=True)
 
-@router.get("/", response_model=list[BookingResponse])
+@router.get("/", response_model=BookingList)
 async def get_all_bookings(
+    request: Request,
+    response: Response,
     pagination: Annotated[PaginationParams, Depends(get_pagination)],
-    db: SessionDep,
+    db: ReadSessionDep,
     current_user: Annotated[UserResponse, Depends(get_current_active_superuser)]
 ):
-    return await get_all_bookings_service(db=db, pagination=pagination)
+    validators = await get_bookings_validators_service(db=db, pagination=pagination)
+    result = await conditional_get(request, response, validators, lambda: get_all_bookings_service(db=db, pagination=pagination))
+    return validated_json(result, BookingList, response)
 
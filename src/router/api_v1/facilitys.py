@@ -1,27 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from src.router.depandency import SessionDep, get_current_active_user, get_current_active_superuser
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
+from src.router.depandency import SessionDep, ReadSessionDep, get_current_active_user, get_current_active_superuser
 from src.service import (
+    upload_facility_image_service,
     create_facility_service,
-    get_facility_by_id_service,
+    get_facility_by_id_cached_service,
     delete_facility_service,
     update_facility_service,
-    get_all_facilities_service
+    get_all_facilities_cached_service,
+    search_facilities_service,
+    get_nearby_facilities_service,
+    get_facility_availability_service,
+    get_facility_availability_grid_service,
+    get_facility_stats_service
 )
-from src.schemas import FacilityCreate, FacilityResponse, FacilityUpdate, FacilityListResponse, PaginationParams
+from src.schemas import FacilityCreate, FacilityResponse, FacilityUpdate, FacilityListResponse, PaginationParams, AvailabilityParams, FacilitySearchParams, NearbyParams, NearbyFacilityResponse, FacilityAvailabilityResponse, FacilityAvailabilityGridResponse, FacilityStatsResponse, StatsParams, CursorPage, UserResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID  
 from typing import Annotated
-from src.utils import get_pagination
+from src.utils import get_pagination, get_availability_params, get_facility_search_params, get_nearby_params, get_stats_params
+from src.core.response_cache import cached_json_response
+from src.core.responses import validated_json
 
 
 router = APIRouter(prefix="/api/v1/facilities", tags=["facilities"])
 
-@router.get("/", response_model=list[FacilityResponse])
+FacilityList = list[FacilityResponse] | CursorPage[FacilityResponse]
+
+@router.get("/", response_model=FacilityList)
 async def get_facilities(
+    request: Request,
     pagination: Annotated[PaginationParams, Depends(get_pagination)],
     session: SessionDep
 ):
-    return await get_all_facilities_service(session, pagination)
+    return cached_json_response(request, await get_all_facilities_cached_service(session, pagination))
+
+@router.get("/search", response_model=FacilityList)
+async def search_facilities(
+    params: Annotated[FacilitySearchParams, Depends(get_facility_search_params)],
+    pagination: Annotated[PaginationParams, Depends(get_pagination)],
+    db: ReadSessionDep
+):
+    return validated_json(await search_facilities_service(db=db, params=params, pagination=pagination), FacilityList)
+
+@router.get("/nearby", response_model=list[NearbyFacilityResponse])
+async def get_nearby_facilities(
+    params: Annotated[NearbyParams, Depends(get_nearby_params)],
+    db: ReadSessionDep
+):
+    return validated_json(await get_nearby_facilities_service(db=db, params=params), list[NearbyFacilityResponse])
 
 @router.post("/", response_model=FacilityResponse, status_code=201)
 async def create_facility(
@@ -32,8 +58,33 @@ async def create_facility(
     return await create_facility_service(db=db, facility_in=facility_in)
 
 @router.get("/{facility_id}", response_model=FacilityResponse)
-async def get_facility_by_id(facility_id: UUID, db: SessionDep):
-    return await get_facility_by_id_service(db=db, facility_id=facility_id)
+async def get_facility_by_id(facility_id: UUID, request: Request, db: SessionDep):
+    return cached_json_response(request, await get_facility_by_id_cached_service(db=db, facility_id=facility_id))
+
+@router.get("/{facility_id}/availability", response_model=FacilityAvailabilityResponse)
+async def get_facility_availability(
+    facility_id: UUID,
+    params: Annotated[AvailabilityParams, Depends(get_availability_params)],
+    db: ReadSessionDep
+):
+    return await get_facility_availability_service(db=db, facility_id=facility_id, params=params)
+
+@router.get("/{facility_id}/availability/grid", response_model=FacilityAvailabilityGridResponse)
+async def get_facility_availability_grid(
+    facility_id: UUID,
+    params: Annotated[AvailabilityParams, Depends(get_availability_params)],
+    db: ReadSessionDep
+):
+    return await get_facility_availability_grid_service(db=db, facility_id=facility_id, params=params)
+
+@router.get("/{facility_id}/stats", response_model=FacilityStatsResponse)
+async def get_facility_stats(
+    facility_id: UUID,
+    params: Annotated[StatsParams, Depends(get_stats_params)],
+    db: ReadSessionDep,
+    current_user: Annotated[UserResponse, Depends(get_current_active_superuser)]
+):
+    return await get_facility_stats_service(db=db, facility_id=facility_id, params=params)
 
 @router.put("/{facility_id}", response_model=FacilityResponse)
 async def update_facility(
@@ -53,5 +104,11 @@ async def delete_facility(
     await delete_facility_service(db=db, facility_id=facility_id)
     return None
 
-
-
+@router.post("/{facility_id}/images", response_model=FacilityResponse, status_code=201)
+async def upload_facility_image(
+    facility_id: UUID,
+    file: Annotated[UploadFile, File()],
+    db: SessionDep,
+    current_user: Annotated[UserResponse, Depends(get_current_active_superuser)]
+):
+    return await upload_facility_image_service(db=db, facility_id=facility_id, file=file)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from src.router.depandency import get_current_active_superuser
+from src.schemas import UserResponse
+from src.core.db import engine, read_engine, pool_stats
+from src.core.cache import user_cache, token_cache
+from src.core.security import password_hash_pool_stats
+from typing import Annotated
+
+
+router = APIRouter(prefix="/api/v1/internal", tags=["internal"])
+
+# numbers are per worker process; each uvicorn worker answers for itself
+@router.get("/metrics")
+async def get_metrics(current_user: Annotated[UserResponse, Depends(get_current_active_superuser)]):
+    return {
+        "db_pool": pool_stats(),
+        "db_replica_pool": pool_stats(read_engine) if read_engine is not engine else None,
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "password_hash_pool": password_hash_pool_stats(),
+    }
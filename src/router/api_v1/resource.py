@@ -1,37 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from src.router.depandency import SessionDep, get_current_active_user, get_current_active_superuser
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
+from src.router.depandency import SessionDep, ReadSessionDep, get_current_active_user, get_current_active_superuser
 from src.service import (
+    upload_resource_image_service,
     create_resource_service,
-    get_resource_by_id_service,
+    get_resource_by_id_cached_service,
     delete_resource_service,
     update_resource_service,
     get_all_resources_service,
-    get_resources_by_facility_id_service
+    get_resources_validators_service,
+    get_resources_by_facility_id_cached_service,
+    get_resource_availability_service
 )
-from src.schemas import ResourceCreate, ResourceResponse, ResourceUpdate, PaginationParams
+from src.schemas import ResourceCreate, ResourceResponse, ResourceUpdate, PaginationParams, AvailabilityParams, ResourceAvailabilityResponse, CursorPage, UserResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID  
 from typing import Annotated
-from src.utils import get_pagination    
+from src.utils import get_pagination, get_availability_params
+from src.core.response_cache import cached_json_response, conditional_get
+from src.core.responses import validated_json
 
 
 router = APIRouter(prefix="/api/v1/resources", tags=["resources"])
 
-@router.get("/", response_model=list[ResourceResponse])
+ResourceList = list[ResourceResponse] | CursorPage[ResourceResponse]
+
+@router.get("/", response_model=ResourceList)
 async def get_resources(
+    request: Request,
+    response: Response,
     pagination: Annotated[PaginationParams, Depends(get_pagination)],
-    session: SessionDep,
+    session: ReadSessionDep,
     current_user: Annotated[ResourceResponse, Depends(get_current_active_superuser)]
 ):
-    return await get_all_resources_service(session, pagination)
+    validators = await get_resources_validators_service(session, pagination)
+    result = await conditional_get(request, response, validators, lambda: get_all_resources_service(session, pagination))
+    return validated_json(result, ResourceList, response)
 
-@router.get("/facility/{facility_id}", response_model=list[ResourceResponse])
+@router.get("/facility/{facility_id}", response_model=ResourceList)
 async def get_resources_by_facility_id(
     facility_id: UUID,
+    request: Request,
     pagination: Annotated[PaginationParams, Depends(get_pagination)],
     session: SessionDep
 ):
-    return await get_resources_by_facility_id_service(session, facility_id, pagination)
+    return cached_json_response(request, await get_resources_by_facility_id_cached_service(session, facility_id, pagination))
 
 @router.post("/", response_model=ResourceResponse, status_code=201)
 async def create_resource(
@@ -43,8 +55,16 @@ async def create_resource(
 
 
 @router.get("/{resource_id}", response_model=ResourceResponse)
-async def get_resource_by_id(resource_id: UUID, db: SessionDep):
-    return await get_resource_by_id_service(db=db, resource_id=resource_id)
+async def get_resource_by_id(resource_id: UUID, request: Request, db: SessionDep):
+    return cached_json_response(request, await get_resource_by_id_cached_service(db=db, resource_id=resource_id))
+
+@router.get("/{resource_id}/availability", response_model=ResourceAvailabilityResponse)
+async def get_resource_availability(
+    resource_id: UUID,
+    params: Annotated[AvailabilityParams, Depends(get_availability_params)],
+    db: ReadSessionDep
+):
+    return await get_resource_availability_service(db=db, resource_id=resource_id, params=params)
 
 @router.put("/{resource_id}", response_model=ResourceResponse)
 async def update_resource(
@@ -65,4 +85,11 @@ async def delete_resource(
     await delete_resource_service(db=db, resource_id=resource_id)
     return None
 
-
+@router.post("/{resource_id}/images", response_model=ResourceResponse, status_code=201)
+async def upload_resource_image(
+    resource_id: UUID,
+    file: Annotated[UploadFile, File()],
+    db: SessionDep,
+    current_user: Annotated[UserResponse, Depends(get_current_active_superuser)]
+):
+    return await upload_resource_image_service(db=db, resource_id=resource_id, file=file)
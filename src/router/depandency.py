@@ -1,7 +1,9 @@
+import time
 from collections.abc import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from src.core.db import AsyncSessionLocal   
+from src.core.db import AsyncSessionLocal, AsyncReadSessionLocal
+from src.core.config import settings
 from typing import Annotated
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends
@@ -9,6 +11,12 @@ from src.models import Users
 from src.core.security import verify_access_token
 from fastapi import HTTPException, status, Request
 from src.crud import get_user_by_id
+from src.core.cache import user_cache
+from src.schemas import UserProfileResponse
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from src.core.response_cache import make_backend, cached_user_generation
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
 
@@ -22,9 +30,105 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 SessionDep = Annotated[AsyncSession, Depends(get_db)]
+
+
+# unix time until which the client's reads go to the primary
+PRIMARY_READS_COOKIE = "db_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def _token_user_id(conn: HTTPConnection) -> str | None:
+    # the Bearer token of API clients or the access_token cookie of the web
+    # pages; verify_access_token caches, so this is a dict lookup per request
+    scheme, _, token = conn.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = conn.cookies.get("access_token")
+    payload = verify_access_token(token) if token else None
+    return payload.get("user_id") if payload else None
+
+def _primary_marker_key(user_id: str) -> str:
+    return f"primary:{user_id}"
+
+# users who wrote within the last DB_REPLICA_STICKY_SECONDS; in the same
+# backend as the response cache, so shared between workers with redis
+primary_markers = make_backend(maxsize=10_000, ttl=settings.DB_REPLICA_STICKY_SECONDS)
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients that just wrote something, so ReadSessionDep keeps their
+    reads on the primary until the replica has caught up.
+
+    Every successful request with an unsafe method sets a cookie and, when it
+    was authenticated, a marker keyed by the user id (primary_markers), since
+    API clients using Bearer tokens usually drop cookies. With the memory
+    backend that marker is per worker; RESPONSE_CACHE_BACKEND=redis shares it
+    between workers.
+    """
+
+    def __init__(self, app: ASGIApp, sticky_seconds: int = settings.DB_REPLICA_STICKY_SECONDS):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_marker(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + self.sticky_seconds
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{PRIMARY_READS_COOKIE}={until}; Max-Age={self.sticky_seconds}; Path=/; HttpOnly; SameSite=lax")
+                user_id = _token_user_id(HTTPConnection(scope))
+                if user_id is not None:
+                    await primary_markers.set(_primary_marker_key(user_id), b"1", self.sticky_seconds)
+            await send(message)
+
+        await self.app(scope, receive, send_with_marker)
+
+
+async def reads_pinned_to_primary(conn: HTTPConnection) -> bool:
+    try:
+        if float(conn.cookies.get(PRIMARY_READS_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    user_id = _token_user_id(conn)
+    if user_id is None:
+        return False
+    return (await primary_markers.get_many([_primary_marker_key(user_id)]))[0] is not None
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    sessionmaker = AsyncSessionLocal if await reads_pinned_to_primary(request) else AsyncReadSessionLocal
+    async with sessionmaker() as session:
+        yield session
+
+# for read-only routes that can tolerate replica lag. Routes that fill the
+# response cache stay on SessionDep: a lagging read right after an
+# invalidation would be cached under the new generation.
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
 TokenDep = Annotated[str, Depends(oauth2scheme)]
 
 
+async def get_cached_user(db: AsyncSession, user_id: str) -> UserProfileResponse | None:
+    # detached snapshot instead of the ORM row so it can outlive the session.
+    # crud.update_user / crud.update_user_me bump the user's generation; it is
+    # read before loading, so a load racing with an update is never trusted
+    key = str(user_id)
+    generation = await cached_user_generation(key)
+    cached = user_cache.get(key)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    db_user = await get_user_by_id(db, user_id)
+    if db_user is None:
+        return None
+    user = UserProfileResponse.model_validate(db_user)
+    user_cache.set(key, (generation, user))
+    return user
+
+
 
 
 
@@ -33,7 +137,7 @@ TokenDep = Annotated[str, Depends(oauth2scheme)]
 async def get_current_user(
     token: TokenDep,
     db: SessionDep
-) -> Users:
+) -> UserProfileResponse:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -46,27 +150,27 @@ async def get_current_user(
             raise credentials_exception
     except Exception:
         raise credentials_exception
-    user = await get_user_by_id(db, user_id)
+    user = await get_cached_user(db, user_id)
     if user is None:
         raise credentials_exception
     return user
 
 async def get_current_active_user(
-    current_user: Users = Depends(get_current_user)
-) -> Users:
+    current_user: UserProfileResponse = Depends(get_current_user)
+) -> UserProfileResponse:
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
     return current_user
 
 async def get_current_active_superuser(
-    current_user: Users = Depends(get_current_active_user)
-) -> Users:
+    current_user: UserProfileResponse = Depends(get_current_active_user)
+) -> UserProfileResponse:
     if not current_user.is_superuser:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="The user doesn't have enough privileges")
     return current_user
 
 
-async def get_current_active_user_from_cookie(request: Request, db: SessionDep) -> Users:
+async def get_current_active_user_from_cookie(request: Request, db: SessionDep) -> UserProfileResponse:
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(
@@ -86,7 +190,7 @@ async def get_current_active_user_from_cookie(request: Request, db: SessionDep)
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="Could not validate credentials",
             headers={"Location": "/web/login"},)
-    user = await get_user_by_id(db, user_id)
+    user = await get_cached_user(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
@@ -100,7 +204,7 @@ async def get_current_active_user_from_cookie(request: Request, db: SessionDep)
     return user
 
 
-async def get_user_profile_from_cookie(request: Request, db: SessionDep) -> Users:
+async def get_user_profile_from_cookie(request: Request, db: SessionDep) -> UserProfileResponse | None:
     token = request.cookies.get("access_token")
     if not token:
         return None
@@ -111,7 +215,7 @@ async def get_user_profile_from_cookie(request: Request, db: SessionDep) -> User
             return None
     except Exception:
         return None
-    user = await get_user_by_id(db, user_id)
+    user = await get_cached_user(db, user_id)
     if user is None or not user.is_active:
         return None
     return user
\ No newline at end of file
@@ -6,6 +6,7 @@ from src.router.web_v1 import home as web_v1_home
 from src.router.api_v1 import facilitys as api_v1_facilitys
 from src.router.api_v1 import resource as api_v1_resource
 from src.router.api_v1 import bookings as api_v1_bookings
+from src.router.api_v1 import metrics as api_v1_metrics
 from fastapi import APIRouter
 
 
@@ -20,6 +21,7 @@ router.include_router(web_v1_home.router)
 router.include_router(api_v1_facilitys.router)
 router.include_router(api_v1_resource.router)
 router.include_router(api_v1_bookings.router)   
+router.include_router(api_v1_metrics.router)
 
 
 
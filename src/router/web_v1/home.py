@@ -1,4 +1,5 @@
 from typing import Annotated
+from collections.abc import Awaitable, Callable
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from src.router.depandency import SessionDep, get_user_profile_from_cookie
 from src.service import (
@@ -6,23 +7,46 @@ from src.service import (
     login_user,
     create_user_service,
     update_user_service,
+    get_all_facilities_service,
+    get_venue_page_service,
+    venue_namespaces,
 )
-from src.schemas import UserSignup, Token, UserUpdateMe, UserResponse, UserProfileResponse
+from src.schemas import UserSignup, Token, UserUpdateMe, UserResponse, UserProfileResponse, PaginationParams
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID   
-from fastapi.templating import Jinja2Templates
-from pathlib import Path
+from src.core.templates import templates, render_template
+from src.core.response_cache import response_cache, cached_page_response
 
 
-templates = Jinja2Templates(directory=Path(__file__).parent.parent.parent / "templates")
+router = APIRouter(prefix="/web", tags=["home"])
 
+VENUE_LIST_SIZE = 100
 
 
-router = APIRouter(prefix="/web", tags=["home"])
+async def _render_page(
+    request: Request,
+    name: str,
+    current_user: UserProfileResponse | None,
+    namespace: str | tuple[str, ...],
+    load: Callable[[], Awaitable[dict]] | None = None,
+):
+    # anonymous renders are identical for everyone, so they are cached under the
+    # facility namespaces the page shows and dropped when that data changes;
+    # a cache hit skips `load` and never touches the database
+    async def context() -> dict:
+        return {"request": request, "current_user": current_user, **(await load() if load else {})}
+
+    if current_user is not None:
+        return templates.TemplateResponse(request, name, await context())
+
+    async def render() -> bytes:
+        return render_template(name, await context())
+    return cached_page_response(request, await response_cache.get_or_render(namespace, f"page:{request.url.path}", render))
+
 
 @router.get("/")
 async def home(request: Request, current_user: Annotated[UserProfileResponse, Depends(get_user_profile_from_cookie)] = None):
-    return templates.TemplateResponse("pages/home.html", {"request": request, "current_user": current_user})
+    return await _render_page(request, "pages/home.html", current_user, "facilities")
 
 
 @router.get("/book")
@@ -31,10 +55,12 @@ async def book_page(request: Request, current_user: Annotated[UserProfileRespons
 
 
 @router.get("/venues")
-async def venue_list_page(request: Request, current_user: Annotated[UserProfileResponse, Depends(get_user_profile_from_cookie)] = None):
-    return templates.TemplateResponse("pages/venues.html", {"request": request, "current_user": current_user})
+async def venue_list_page(request: Request, db: SessionDep, current_user: Annotated[UserProfileResponse, Depends(get_user_profile_from_cookie)] = None):
+    async def load() -> dict:
+        return {"venues": await get_all_facilities_service(db, PaginationParams(page_size=VENUE_LIST_SIZE))}
+    return await _render_page(request, "pages/venues.html", current_user, "facilities", load)
 
 
 @router.get("/venues/{venue_id}")
-async def venue_page(venue_id: str, request: Request, current_user: Annotated[UserProfileResponse, Depends(get_user_profile_from_cookie)] = None):
-    return templates.TemplateResponse("pages/venue.html", {"request": request, "current_user": current_user, "venue_id": venue_id})
+async def venue_page(venue_id: UUID, request: Request, db: SessionDep, current_user: Annotated[UserProfileResponse, Depends(get_user_profile_from_cookie)] = None):
+    return await _render_page(request, "pages/venue.html", current_user, venue_namespaces(venue_id), lambda: get_venue_page_service(db, venue_id))
@@ -13,10 +13,7 @@ from src.schemas import UserSignup, Token, UserUpdateMe, UserResponse, UserProfi
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID  
 from typing import Annotated
-from fastapi.templating import Jinja2Templates
-from pathlib import Path    
-
-templates = Jinja2Templates(directory=Path(__file__).parent.parent.parent / "templates")
+from src.core.templates import templates
 
 router = APIRouter(prefix="/web", tags=["login"])
 
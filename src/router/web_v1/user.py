@@ -10,10 +10,7 @@ from src.schemas import UserSignup, Token, UserUpdateMe, UserResponse, UserProfi
 from fastapi import Depends 
 from typing import Annotated 
 from src.core.security import create_access_token
-from fastapi.templating import Jinja2Templates
-from pathlib import Path
-
-templates = Jinja2Templates(directory=Path(__file__).parent.parent.parent / "templates")
+from src.core.templates import templates
 
 
 router = APIRouter(prefix="/web/users", tags=["users"])  
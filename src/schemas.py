@@ -1,12 +1,46 @@
-from pydantic import BaseModel, EmailStr, field_validator, computed_field
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator, computed_field
+from typing import Generic, Literal, TypeVar
 from uuid import UUID
-from datetime import datetime, time 
+from datetime import date, datetime, time 
 from fastapi import UploadFile
+from src.core.images import CARD_IMAGE_EDGE, image_response_data
 
 
 class PaginationParams(BaseModel):
     page: int = 1
     page_size: int = 10
+    # opaque keyset cursor; when set (even to "") the list is paged by cursor
+    cursor: str | None = None
+
+class AvailabilityParams(BaseModel):
+    date: date
+    slot_minutes: int = 60
+
+class FacilitySearchParams(BaseModel):
+    q: str | None = None
+    city: str | None = None
+    state: str | None = None
+    open_at: time | None = None
+    amenities: list[str] = []
+
+class NearbyParams(BaseModel):
+    lat: float
+    lon: float
+    radius_km: float = 10
+    limit: int = 20
+    availability: bool = False
+
+class BookingExportParams(BaseModel):
+    format: Literal["csv", "ndjson"] = "csv"
+    window_start: datetime | None = None
+    window_end: datetime | None = None
+    facility_id: UUID | None = None
+    resource_id: UUID | None = None
+
+class StatsParams(BaseModel):
+    granularity: Literal["day", "week", "month"] = "day"
+    window_start: date
+    window_end: date
 
 class ORMBase(BaseModel):
     model_config = {
@@ -14,6 +48,12 @@ class ORMBase(BaseModel):
         "populate_by_name": True,
     }
 
+T = TypeVar("T")
+
+class CursorPage(ORMBase, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
 
 
 class UserBase(ORMBase):
@@ -106,6 +146,10 @@ class FacilityBase(ORMBase):
     email: EmailStr | None = None
     open_at: time | None = None
     close_at: time | None = None
+    # e.g. {"parking": true, "showers": true}; searched with @> containment
+    amenities: dict | None = None
+    latitude: float | None = Field(None, ge=-90, le=90)
+    longitude: float | None = Field(None, ge=-180, le=180)
 
     @field_validator("email", "open_at", "close_at", mode="before")
     def empty_string_to_none(cls, v):
@@ -113,6 +157,13 @@ class FacilityBase(ORMBase):
             return None
         return v
 
+    @model_validator(mode="after")
+    def coordinates_both_or_none(self):
+        # same rule as the facility_coordinates_valid CHECK
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude and longitude must be given together")
+        return self
+
 
 class FacilityCreate(FacilityBase):
     pass
@@ -126,6 +177,9 @@ class FacilityUpdate(ORMBase):
     email: EmailStr | None = None
     open_at: time | None = None
     close_at: time | None = None
+    amenities: dict | None = None
+    latitude: float | None = Field(None, ge=-90, le=90)
+    longitude: float | None = Field(None, ge=-180, le=180)
 
     @field_validator("email", "open_at", "close_at", mode="before")
     def empty_string_to_none(cls, v):
@@ -133,7 +187,42 @@ class FacilityUpdate(ORMBase):
             return None
         return v
 
-class FacilityResponse(FacilityBase):
+class ImageVariantResponse(ORMBase):
+    url: str
+    width: int
+    height: int
+
+class ImageResponse(ORMBase):
+    url: str
+    width: int | None = None
+    height: int | None = None
+    variants: dict[str, ImageVariantResponse] = {}
+
+    def url_for(self, min_edge: int) -> str:
+        """Smallest variant whose longest edge covers min_edge, falling back to the original."""
+        for variant in sorted(self.variants.values(), key=lambda v: max(v.width, v.height)):
+            if max(variant.width, variant.height) >= min_edge:
+                return variant.url
+        return self.url
+
+def _stored_images(value):
+    if value is None:
+        return None
+    # stored JSONB entries (bare keys or {"key", "variants"} dicts) become URLs here
+    return [image_response_data(entry) if isinstance(entry, str) or (isinstance(entry, dict) and "key" in entry) else entry for entry in value]
+
+class ImagesMixin(ORMBase):
+    # the images column of Facilities and Resources, as served to clients
+    images: list[ImageResponse] | None = None
+
+    _stored_images = field_validator("images", mode="before")(_stored_images)
+
+    @computed_field
+    @property
+    def thumbnail_url(self) -> str | None:
+        return self.images[0].url_for(CARD_IMAGE_EDGE) if self.images else None
+
+class FacilityResponse(ImagesMixin, FacilityBase):
     id: UUID
 
 
@@ -170,10 +259,14 @@ class ResourceUpdate(ORMBase):
     price_per_hour: float | None = None
     description: str | None = None
 
-class ResourceResponse(ResourceBase):
+class ResourceResponse(ImagesMixin, ResourceBase):
     id: UUID
 
 
+class VenueResponse(FacilityResponse):
+    resources: list[ResourceResponse] = []
+
+
 class BookingBase(ORMBase):
     resource_id: UUID
     start_time: datetime
@@ -188,11 +281,117 @@ class BookingResponse(BookingBase):
     total_price: float
     user_id: UUID
 
+class FacilitySummary(ORMBase):
+    id: UUID
+    name: str | None = None
+    city: str
+    address: str
+
+class ResourceSummary(ORMBase):
+    id: UUID
+    name: str
+    price_per_hour: float
+    # only present with expand=facility
+    facility: FacilitySummary | None = None
+
+class BookingExpandedResponse(BookingResponse):
+    # only present with expand=resource / expand=facility
+    resource: ResourceSummary | None = None
+
 class BookingUpdate(ORMBase):
     resource_id: UUID | None = None
     start_time: datetime | None = None
     end_time: datetime | None = None
 
+class BookingBatchCreate(ORMBase):
+    bookings: list[BookingCreate] = Field(min_length=1, max_length=500)
+    # all_or_nothing: any rejected item fails the whole batch
+    # partial: book what fits and report the rest in `rejected`
+    mode: Literal["all_or_nothing", "partial"] = "all_or_nothing"
+
+class BookingBatchRejection(BookingBase):
+    index: int
+    reason: str
+
+class BookingBatchResponse(ORMBase):
+    created: list[BookingResponse]
+    rejected: list[BookingBatchRejection]
+
+class BookingSeriesCreate(BookingBase):
+    # start_time/end_time are the first occurrence; it repeats every
+    # `interval` days/weeks until `count` occurrences or `until`, whichever comes first
+    frequency: Literal["daily", "weekly"]
+    interval: int = Field(1, ge=1, le=52)
+    count: int | None = Field(None, ge=1, le=730)
+    until: datetime | None = None
+
+class BookingSeriesResponse(ORMBase):
+    id: UUID
+    resource_id: UUID
+    user_id: UUID
+    frequency: str
+    interval: int
+    first_start: datetime
+    first_end: datetime
+    count: int | None = None
+    until: datetime | None = None
+    ends_at: datetime
+    price_per_occurrence: float
+
+
+class TimeInterval(ORMBase):
+    start_time: datetime
+    end_time: datetime
+
+class ResourceAvailabilityResponse(ORMBase):
+    resource_id: UUID
+    date: date
+    slot_minutes: int
+    free: list[TimeInterval]
+    slots: list[TimeInterval]
+
+class FacilityAvailabilityResponse(ORMBase):
+    facility_id: UUID
+    date: date
+    slot_minutes: int
+    resources: list[ResourceAvailabilityResponse]
+
+class NearbyFacilityResponse(FacilityResponse):
+    distance_km: float
+    # today's free time per resource, only when requested with availability=true
+    availability: FacilityAvailabilityResponse | None = None
+
+class ResourceSlotMask(ORMBase):
+    resource_id: UUID
+    name: str
+    # one character per slot, "1" = booked
+    booked: str
+
+class FacilityAvailabilityGridResponse(ORMBase):
+    facility_id: UUID
+    date: date
+    slot_minutes: int
+    window_start: datetime
+    window_end: datetime
+    slot_count: int
+    resources: list[ResourceSlotMask]
+
+class ResourceStatsPeriod(ORMBase):
+    resource_id: UUID
+    period_start: date
+    booking_count: int
+    revenue: float
+    booked_hours: float
+    # share of the facility's opening hours in the period that was booked
+    utilization: float
+
+class FacilityStatsResponse(ORMBase):
+    facility_id: UUID
+    granularity: str
+    window_start: date
+    window_end: date
+    periods: list[ResourceStatsPeriod]
+
 
 
 
@@ -1,4 +1,5 @@
 import src.crud as crud
+from src.models import Bookings, Facilities, Resources
 from src.schemas import (
     UserSignup, 
     UserUpdate, 
@@ -15,18 +16,113 @@ from src.schemas import (
     BookingCreate,
     BookingUpdate,
     BookingResponse,
-    PaginationParams
+    BookingExpandedResponse,
+    ResourceSummary,
+    FacilitySummary,
+    BookingBatchCreate,
+    BookingBatchRejection,
+    BookingBatchResponse,
+    BookingSeriesCreate,
+    BookingSeriesResponse,
+    BookingExportParams,
+    PaginationParams,
+    CursorPage,
+    AvailabilityParams,
+    FacilitySearchParams,
+    NearbyParams,
+    NearbyFacilityResponse,
+    VenueResponse,
+    TimeInterval,
+    ResourceAvailabilityResponse,
+    FacilityAvailabilityResponse,
+    FacilityAvailabilityGridResponse,
+    StatsParams,
+    ResourceStatsPeriod,
+    FacilityStatsResponse,
+    ResourceSlotMask
 )
 from src.core.security import create_access_token
+from src.core.storage import upload_file_to_storage, put_bytes_to_storage, delete_file_from_storage
+from src.core.images import render_derivatives, variant_key
+from src.core.templates import render_template
+from src.core.response_cache import CachedResponse, Validators, response_cache, object_validators, list_validators
+from PIL import Image
+from markupsafe import Markup
 from src.core.config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from uuid import UUID
-from datetime import timedelta
-from fastapi import HTTPException, status  
-from src.utils import get_pagination, calculate_total_price
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from functools import partial
+from collections.abc import AsyncIterator, Callable
+from pydantic_core import to_json
+from fastapi import HTTPException, UploadFile, status  
+from pathlib import PurePath
+import asyncio
+import csv
+import io
+import uuid
+from src.utils import (
+    get_pagination,
+    get_opening_window,
+    compute_free_intervals,
+    split_into_slots,
+    encode_cursor,
+    decode_cursor,
+    build_slot_mask,
+    find_batch_conflicts,
+    series_step,
+    series_ends_at,
+    expand_series,
+    slot_mask_to_str,
+    period_end
+)
  
 
 
+def _page_args(pagination: PaginationParams, sort_key: str) -> dict:
+    if pagination.cursor is None:
+        return {"limit": pagination.page_size, "offset": (pagination.page - 1) * pagination.page_size}
+    try:
+        after = decode_cursor(pagination.cursor, sort_key)
+    except ValueError:
+        # well-formed, but issued by a list with a different sort order
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor."
+        )
+    # one extra row tells us whether there is a next page
+    return {"limit": pagination.page_size + 1, "offset": 0, "after": after}
+
+def _page_response(rows: list, pagination: PaginationParams, schema: type, sort_key: str, build: Callable | None = None) -> list | CursorPage:
+    build = build or schema.model_validate
+    if pagination.cursor is None:
+        return [build(row) for row in rows]
+    has_more = len(rows) > pagination.page_size
+    rows = rows[:pagination.page_size]
+    next_cursor = encode_cursor(sort_key, getattr(rows[-1], sort_key), rows[-1].id) if has_more else None
+    return CursorPage[schema](items=[build(row) for row in rows], next_cursor=next_cursor)
+
+def _from_row(schema: type) -> Callable:
+    # projected rows from crud.response_columns validate as dicts, which is
+    # cheaper than pydantic's from_attributes path
+    return lambda row: schema.model_validate(row._asdict())
+
+def _expand_booking(booking, expand: frozenset[str]) -> BookingExpandedResponse:
+    # built field by field so a relationship that wasn't eager-loaded is never
+    # touched (a lazy load would fail on the async session)
+    resource = booking.resource
+    summary = ResourceSummary(id=resource.id, name=resource.name, price_per_hour=resource.price_per_hour)
+    if "facility" in expand:
+        summary.facility = FacilitySummary.model_validate(resource.facility)
+    return BookingExpandedResponse(**BookingResponse.model_validate(booking).model_dump(), resource=summary)
+
+def _booking_page_response(bookings: list, pagination: PaginationParams, expand: frozenset[str]) -> list | CursorPage:
+    if not expand:
+        return _page_response(bookings, pagination, BookingResponse, "start_time")
+    return _page_response(bookings, pagination, BookingExpandedResponse, "start_time", partial(_expand_booking, expand=expand))
+
 
 async def register_user(db: AsyncSession, user_in: UserSignup) -> dict:
     existing_user = await crud.get_user_by_email(db, user_in.email)
@@ -105,12 +201,6 @@ async def get_user_profile_service(db: AsyncSession, email: str) -> UserProfileR
         )
     return UserProfileResponse.model_validate(user)
 
-async def get_all_users_service(db: AsyncSession, pagination: PaginationParams) -> list[UserResponse]:
-    offset = (pagination.page - 1) * pagination.page_size
-    limit = pagination.page_size
-    users = await crud.get_all_users(db, limit=limit, offset=offset)
-    return [UserResponse.model_validate(user) for user in users]
-
 async def get_user_by_id_service(db: AsyncSession, user_id: UUID) -> UserResponse:
     user = await crud.get_user_by_id(db, user_id)
     if not user:
@@ -128,6 +218,7 @@ async def create_facility_service(db: AsyncSession, facility_in: FacilityCreate)
             detail="Facility with the same name already exists in the city."
         )
     new_facility = await crud.create_facility(db, facility_in)
+    await response_cache.invalidate("facilities")
     return FacilityResponse.model_validate(new_facility)
 
 async def get_facility_by_id_service(db: AsyncSession, facility_id: UUID) -> FacilityResponse:
@@ -140,11 +231,62 @@ async def get_facility_by_id_service(db: AsyncSession, facility_id: UUID) -> Fac
     return FacilityResponse.model_validate(facility)
 
 
-async def get_all_facilities_service(db: AsyncSession, pagination: PaginationParams) -> list[FacilityResponse]:
-    offset = (pagination.page - 1) * pagination.page_size
-    limit = pagination.page_size
-    facilities = await crud.get_all_facilities(db, limit=limit, offset=offset)
-    return [FacilityResponse.model_validate(facility) for facility in facilities]
+async def get_all_facilities_service(db: AsyncSession, pagination: PaginationParams) -> list[FacilityResponse] | CursorPage[FacilityResponse]:
+    facilities = await crud.get_all_facilities(db, **_page_args(pagination, "created_at"))
+    return _page_response(facilities, pagination, FacilityResponse, "created_at", _from_row(FacilityResponse))
+
+async def search_facilities_service(db: AsyncSession, params: FacilitySearchParams, pagination: PaginationParams) -> list[FacilityResponse] | CursorPage[FacilityResponse]:
+    sort_key = "search_rank" if params.q else "created_at"
+    facilities = await crud.search_facilities(db, params, **_page_args(pagination, sort_key))
+    return _page_response(facilities, pagination, FacilityResponse, sort_key)
+
+def _list_cache_key(pagination: PaginationParams) -> str:
+    return f"{pagination.page}:{pagination.page_size}:{pagination.cursor}"
+
+# Cached variants of the public reads: they return the serialized JSON body and its
+# ETag. Every mutator below invalidates the namespaces whose responses it changes.
+async def get_all_facilities_cached_service(db: AsyncSession, pagination: PaginationParams) -> CachedResponse:
+    return await response_cache.get_or_load("facilities", _list_cache_key(pagination), lambda: get_all_facilities_service(db, pagination))
+
+async def get_facility_by_id_cached_service(db: AsyncSession, facility_id: UUID) -> CachedResponse:
+    return await response_cache.get_or_load(f"facility:{facility_id}", "", lambda: get_facility_by_id_service(db, facility_id))
+
+# server-rendered parts of the venue page, cached per facility
+VENUE_FRAGMENTS = {
+    "resource_cards": "partials/venue_resources.html",
+    "price_table": "partials/venue_prices.html",
+}
+
+def venue_namespaces(facility_id: UUID) -> tuple[str, str]:
+    # the facility and resource mutators already invalidate both of these
+    return (f"facility:{facility_id}", f"resources:facility:{facility_id}")
+
+async def get_venue_page_service(db: AsyncSession, facility_id: UUID) -> dict:
+    facility = await crud.get_facility_with_resources(db, facility_id)
+    if not facility:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Facility not found."
+        )
+    venue = VenueResponse.model_validate(facility)
+    venue.resources.sort(key=lambda resource: resource.name)
+    context = {"venue": venue}
+    for name, template in VENUE_FRAGMENTS.items():
+        async def render(template: str = template) -> bytes:
+            return render_template(template, {"venue": venue})
+        fragment = await response_cache.get_or_render(venue_namespaces(facility_id), f"fragment:{name}", render)
+        context[name] = Markup(fragment.body.decode())
+    return context
+
+async def get_resource_by_id_cached_service(db: AsyncSession, resource_id: UUID) -> CachedResponse:
+    return await response_cache.get_or_load(f"resource:{resource_id}", "", lambda: get_resource_by_id_service(db, resource_id))
+
+async def get_resources_by_facility_id_cached_service(db: AsyncSession, facility_id: UUID, pagination: PaginationParams) -> CachedResponse:
+    return await response_cache.get_or_load(
+        f"resources:facility:{facility_id}",
+        _list_cache_key(pagination),
+        lambda: get_resources_by_facility_id_service(db, facility_id, pagination),
+    )
 
 async def delete_facility_service(db: AsyncSession, facility_id: UUID):
     facility = await crud.get_facility_by_id(db, facility_id)
@@ -153,7 +295,14 @@ async def delete_facility_service(db: AsyncSession, facility_id: UUID):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Facility not found."
         )
-    await crud.delete_facility(db, facility)    
+    resource_ids = await crud.get_resource_ids_by_facility_id(db, facility_id)
+    await crud.delete_facility(db, facility)
+    await response_cache.invalidate(
+        "facilities",
+        f"facility:{facility_id}",
+        f"resources:facility:{facility_id}",
+        *(f"resource:{resource_id}" for resource_id in resource_ids),
+    )
 
 
 async def update_facility_service(db: AsyncSession, facility_id: UUID, facility_in: FacilityUpdate) -> FacilityResponse:
@@ -170,10 +319,59 @@ async def update_facility_service(db: AsyncSession, facility_id: UUID, facility_
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Facility with the same name already exists in the city."
             )
+    # a partial update may set one coordinate; the pair is checked against the stored row
+    updates = facility_in.model_dump(include={"latitude", "longitude"}, exclude_unset=True)
+    latitude = updates.get("latitude", facility.latitude)
+    longitude = updates.get("longitude", facility.longitude)
+    if (latitude is None) != (longitude is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Facility latitude and longitude must be set together."
+        )
     updated_facility = await crud.update_facility(db, facility, facility_in)
+    await response_cache.invalidate("facilities", f"facility:{facility_id}")
     return FacilityResponse.model_validate(updated_facility)
 
 
+async def _upload_image(db: AsyncSession, model, obj_id: UUID, prefix: str, file: UploadFile):
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file must be an image"
+        )
+    try:
+        (width, height), derivatives = await render_derivatives(file.file)
+    except (OSError, Image.DecompressionBombError):
+        # OSError covers UnidentifiedImageError and truncated or corrupt data
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file must be an image"
+        )
+    image_key = f"{prefix}/{obj_id}/{uuid.uuid4().hex}{PurePath(file.filename or '').suffix.lower()}"
+    image = {"key": image_key, "width": width, "height": height, "variants": {}}
+    uploads = [upload_file_to_storage(image_key, file)]
+    for name, (data, variant_width, variant_height) in derivatives.items():
+        image["variants"][name] = {"key": variant_key(image_key, name), "width": variant_width, "height": variant_height}
+        uploads.append(put_bytes_to_storage(image["variants"][name]["key"], data, "image/webp"))
+    await asyncio.gather(*uploads)
+    obj = await crud.append_image(db, model, obj_id, image)
+    if obj is None:
+        # the row went away while the upload was in flight
+        await asyncio.gather(*(delete_file_from_storage(key) for key in [image_key, *(v["key"] for v in image["variants"].values())]))
+    return obj
+
+async def upload_facility_image_service(db: AsyncSession, facility_id: UUID, file: UploadFile) -> FacilityResponse:
+    facility = await crud.get_facility_by_id(db, facility_id)
+    if facility:
+        facility = await _upload_image(db, Facilities, facility_id, "facilities", file)
+    if not facility:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Facility not found."
+        )
+    await response_cache.invalidate("facilities", f"facility:{facility_id}")
+    return FacilityResponse.model_validate(facility)
+
 async def create_resource_service(db: AsyncSession, resource_in: ResourceCreate) -> ResourceResponse:
     facility = await crud.get_facility_by_id(db, resource_in.facility_id)
     if not facility:
@@ -182,6 +380,7 @@ async def create_resource_service(db: AsyncSession, resource_in: ResourceCreate)
             detail="Facility not found."
         )
     new_resource = await crud.create_resource(db, resource_in)
+    await response_cache.invalidate(f"resources:facility:{new_resource.facility_id}")
     return ResourceResponse.model_validate(new_resource)
 
 async def get_resource_by_id_service(db: AsyncSession, resource_id: UUID) -> ResourceResponse:
@@ -193,20 +392,112 @@ async def get_resource_by_id_service(db: AsyncSession, resource_id: UUID) -> Res
         )
     return ResourceResponse.model_validate(resource)
 
-async def get_resources_by_facility_id_service(db: AsyncSession, facility_id: UUID, pagination: PaginationParams) -> list[ResourceResponse]:
-    offset = (pagination.page - 1) * pagination.page_size
-    limit = pagination.page_size
+async def get_resources_by_facility_id_service(db: AsyncSession, facility_id: UUID, pagination: PaginationParams) -> list[ResourceResponse] | CursorPage[ResourceResponse]:
+    resources = await crud.get_resources_by_facility_id(db, facility_id, **_page_args(pagination, "created_at"))
+    # only an empty page needs the extra lookup to tell "no resources" from "no facility"
+    if not resources and not await crud.get_facility_by_id(db, facility_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Facility not found."
+        )
+    return _page_response(resources, pagination, ResourceResponse, "created_at")
+
+def _add_series_occurrences(busy_by_resource: dict[UUID, list[tuple[datetime, datetime]]], series_list: list, window_start: datetime, window_end: datetime) -> None:
+    # recurring series are stored as rules; expand just the part inside the window
+    touched = set()
+    for series in series_list:
+        step = series_step(series.frequency, series.interval)
+        occurrences = expand_series(series.first_start, series.first_end, step, series.ends_at, window_start, window_end)
+        if occurrences:
+            busy_by_resource.setdefault(series.resource_id, []).extend(occurrences)
+            touched.add(series.resource_id)
+    for resource_id in touched:
+        busy_by_resource[resource_id].sort()
+
+def _build_resource_availability(resource_id: UUID, params: AvailabilityParams, window_start: datetime, window_end: datetime, busy: list[tuple[datetime, datetime]]) -> ResourceAvailabilityResponse:
+    free = compute_free_intervals(window_start, window_end, busy)
+    slots = split_into_slots(window_start, free, params.slot_minutes)
+    return ResourceAvailabilityResponse(
+        resource_id=resource_id,
+        date=params.date,
+        slot_minutes=params.slot_minutes,
+        free=[TimeInterval(start_time=start, end_time=end) for start, end in free],
+        slots=[TimeInterval(start_time=start, end_time=end) for start, end in slots],
+    )
+
+async def get_resource_availability_service(db: AsyncSession, resource_id: UUID, params: AvailabilityParams) -> ResourceAvailabilityResponse:
+    resource = await crud.get_resource_with_facility(db, resource_id)
+    if not resource:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resource not found."
+        )
+    window_start, window_end = get_opening_window(params.date, resource.facility.open_at, resource.facility.close_at)
+    busy_by_resource = {resource_id: list(await crud.get_booked_intervals_by_resource_id(db, resource_id, window_start, window_end))}
+    series_list = await crud.get_series_by_resource_ids(db, [resource_id], window_start, window_end)
+    _add_series_occurrences(busy_by_resource, series_list, window_start, window_end)
+    return _build_resource_availability(resource_id, params, window_start, window_end, busy_by_resource[resource_id])
+
+async def get_facility_availability_service(db: AsyncSession, facility_id: UUID, params: AvailabilityParams) -> FacilityAvailabilityResponse:
     facility = await crud.get_facility_by_id(db, facility_id)
     if not facility:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Facility not found."
         )
-    resources = await crud.get_resources_by_facility_id(db, facility_id, limit=limit, offset=offset)
-    copy_resources = await crud.get_resources_by_facility_id(db, facility_id, limit=limit, offset=offset)
-    for resource in copy_resources:
-        print(resource.facility_id)
-    return [ResourceResponse.model_validate(resource) for resource in resources]
+    window_start, window_end = get_opening_window(params.date, facility.open_at, facility.close_at)
+    rows = await crud.get_booked_intervals_by_facility_id(db, facility_id, window_start, window_end)
+    busy_by_resource: dict[UUID, list[tuple[datetime, datetime]]] = {}
+    for resource_id, _, start_time, end_time in rows:
+        busy = busy_by_resource.setdefault(resource_id, [])
+        if start_time is not None:
+            busy.append((start_time, end_time))
+    series_list = await crud.get_series_by_facility_id(db, facility_id, window_start, window_end)
+    _add_series_occurrences(busy_by_resource, series_list, window_start, window_end)
+    return _build_facility_availability(facility_id, params, window_start, window_end, busy_by_resource)
+
+def _build_facility_availability(facility_id: UUID, params: AvailabilityParams, window_start: datetime, window_end: datetime, busy_by_resource: dict[UUID, list[tuple[datetime, datetime]]]) -> FacilityAvailabilityResponse:
+    return FacilityAvailabilityResponse(
+        facility_id=facility_id,
+        date=params.date,
+        slot_minutes=params.slot_minutes,
+        resources=[
+            _build_resource_availability(resource_id, params, window_start, window_end, busy)
+            for resource_id, busy in busy_by_resource.items()
+        ],
+    )
+
+async def get_nearby_facilities_service(db: AsyncSession, params: NearbyParams) -> list[NearbyFacilityResponse]:
+    facilities = await crud.get_facilities_nearby(db, params.lat, params.lon, params.radius_km, params.limit)
+    results = [NearbyFacilityResponse.model_validate(facility) for facility in facilities]
+    if not params.availability or not facilities:
+        return results
+    # today's availability for every result with one bookings query and one
+    # series query over the union of their opening windows
+    availability_params = AvailabilityParams(date=date.today())
+    windows = {facility.id: get_opening_window(availability_params.date, facility.open_at, facility.close_at) for facility in facilities}
+    span_start = min(start for start, _ in windows.values())
+    span_end = max(end for _, end in windows.values())
+    rows = await crud.get_booked_intervals_by_facility_ids(db, list(windows), span_start, span_end)
+    busy_by_facility: dict[UUID, dict[UUID, list[tuple[datetime, datetime]]]] = {}
+    facility_of_resource: dict[UUID, UUID] = {}
+    for facility_id, resource_id, start_time, end_time in rows:
+        busy = busy_by_facility.setdefault(facility_id, {}).setdefault(resource_id, [])
+        facility_of_resource[resource_id] = facility_id
+        if start_time is not None:
+            busy.append((start_time, end_time))
+    series_list = await crud.get_series_by_resource_ids(db, list(facility_of_resource), span_start, span_end) if facility_of_resource else []
+    for result in results:
+        window_start, window_end = windows[result.id]
+        busy_by_resource = busy_by_facility.get(result.id, {})
+        _add_series_occurrences(
+            busy_by_resource,
+            [series for series in series_list if facility_of_resource[series.resource_id] == result.id],
+            window_start,
+            window_end,
+        )
+        result.availability = _build_facility_availability(result.id, availability_params, window_start, window_end, busy_by_resource)
+    return results
 
 async def delete_resource_service(db: AsyncSession, resource_id: UUID):
     resource = await crud.get_resource_by_id(db, resource_id)
@@ -215,7 +506,9 @@ async def delete_resource_service(db: AsyncSession, resource_id: UUID):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Resource not found."
         )
+    facility_id = resource.facility_id
     await crud.delete_resource(db, resource)
+    await response_cache.invalidate(f"resource:{resource_id}", f"resources:facility:{facility_id}")
 
 
 async def update_resource_service(db: AsyncSession, resource_id: UUID, resource_in: ResourceUpdate) -> ResourceResponse:
@@ -232,39 +525,167 @@ async def update_resource_service(db: AsyncSession, resource_id: UUID, resource_
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Facility not found."
             )
+    old_facility_id = resource.facility_id
     updated_resource = await crud.update_resource(db, resource, resource_in)
+    await response_cache.invalidate(
+        f"resource:{resource_id}",
+        *{f"resources:facility:{old_facility_id}", f"resources:facility:{updated_resource.facility_id}"},
+    )
     return ResourceResponse.model_validate(updated_resource)
 
 
-async def get_all_resources_service(db: AsyncSession, pagination: PaginationParams) -> list[ResourceResponse]:
-    offset = (pagination.page - 1) * pagination.page_size
-    limit = pagination.page_size
-    resources = await crud.get_all_resources(db, limit=limit, offset=offset)
-    return [ResourceResponse.model_validate(resource) for resource in resources]
+async def upload_resource_image_service(db: AsyncSession, resource_id: UUID, file: UploadFile) -> ResourceResponse:
+    resource = await crud.get_resource_by_id(db, resource_id)
+    if resource:
+        resource = await _upload_image(db, Resources, resource_id, "resources", file)
+    if not resource:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resource not found."
+        )
+    await response_cache.invalidate(f"resource:{resource_id}", f"resources:facility:{resource.facility_id}")
+    return ResourceResponse.model_validate(resource)
+
+async def get_resources_validators_service(db: AsyncSession, pagination: PaginationParams) -> Validators:
+    page = await crud.get_resources_version(db, **_page_args(pagination, "created_at"))
+    return list_validators("resources", page, _list_cache_key(pagination))
+
+async def get_all_resources_service(db: AsyncSession, pagination: PaginationParams) -> list[ResourceResponse] | CursorPage[ResourceResponse]:
+    resources = await crud.get_all_resources(db, **_page_args(pagination, "created_at"))
+    return _page_response(resources, pagination, ResourceResponse, "created_at", _from_row(ResourceResponse))
 
 
 async def create_booking_service(db: AsyncSession, booking_in: BookingCreate, user_id: UUID, facility_id: UUID) -> BookingResponse:
-    check_resource_facility = await crud.get_resource_by_id(db, booking_in.resource_id)
-    if not check_resource_facility or check_resource_facility.facility_id != facility_id:
+    if booking_in.end_time <= booking_in.start_time:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Resource not found in the specified facility."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Booking end time must be after start time."
         )
-    resource = await crud.get_resource_by_id(db, booking_in.resource_id)
-    check_conflict = await crud.check_booking_conflict(db, booking_in.resource_id, booking_in.start_time, booking_in.end_time)
-    if not resource:
+    try:
+        new_booking = await crud.create_booking(db, booking_in, user_id, facility_id)
+    except IntegrityError as e:
+        await db.rollback()
+        if crud.is_booking_conflict(e):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Booking conflict: The resource is already booked for the specified time range."
+            )
+        raise
+    if not new_booking:
+        # nothing inserted: either a recurring series owns the slot or the resource is wrong
+        if await crud.check_series_conflict(db, booking_in.resource_id, booking_in.start_time, booking_in.end_time):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Booking conflict: The resource is already booked for the specified time range."
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Resource not found."
+            detail="Resource not found in the specified facility."
         )
-    if check_conflict:
+    return BookingResponse.model_validate(new_booking)
+
+async def _create_bookings_one_by_one(db: AsyncSession, items: list[BookingCreate], indexes: list[int], user_id: UUID, facility_id: UUID, rejected: dict[int, str]) -> list[BookingResponse]:
+    # responses are built as we go: a later rollback expires the ORM objects
+    created = []
+    for index in indexes:
+        try:
+            booking = await crud.create_booking(db, items[index], user_id, facility_id)
+        except IntegrityError as e:
+            await db.rollback()
+            if not crud.is_booking_conflict(e):
+                raise
+            booking = None
+        if booking:
+            created.append(BookingResponse.model_validate(booking))
+        else:
+            # taken by a concurrent booking or series since the range check
+            rejected[index] = "Booking conflict: The resource is already booked for the specified time range."
+    return created
+
+async def create_bookings_batch_service(db: AsyncSession, batch_in: BookingBatchCreate, user_id: UUID, facility_id: UUID) -> BookingBatchResponse:
+    items = batch_in.bookings
+    rejected: dict[int, str] = {}
+    for index, item in enumerate(items):
+        if item.end_time <= item.start_time:
+            rejected[index] = "Booking end time must be after start time."
+    # locked (shared) until the insert commits, so the series check below
+    # can't be overtaken by a concurrent create_booking_series_service
+    resources = {
+        resource.id: resource
+        for resource in await crud.get_resources_by_ids(db, facility_id, list({item.resource_id for item in items}))
+    }
+    for index, item in enumerate(items):
+        if index not in rejected and item.resource_id not in resources:
+            rejected[index] = "Resource not found in the specified facility."
+
+    candidates = [index for index in range(len(items)) if index not in rejected]
+    if candidates:
+        # every existing booking (and recurring series) that could collide, in one range query each
+        candidate_resource_ids = list({items[index].resource_id for index in candidates})
+        batch_start = min(items[index].start_time for index in candidates)
+        batch_end = max(items[index].end_time for index in candidates)
+        existing = await crud.get_booked_intervals_by_resource_ids(db, candidate_resource_ids, batch_start, batch_end)
+        series_list = await crud.get_series_by_resource_ids(db, candidate_resource_ids, batch_start, batch_end)
+        busy_by_resource: dict[UUID, list[tuple[datetime, datetime]]] = {}
+        for resource_id, start_time, end_time in existing:
+            busy_by_resource.setdefault(resource_id, []).append((start_time, end_time))
+        _add_series_occurrences(busy_by_resource, series_list, batch_start, batch_end)
+        candidates.sort(key=lambda index: (items[index].resource_id, items[index].start_time, index))
+        for resource_id, group in groupby(candidates, key=lambda index: items[index].resource_id):
+            group = list(group)
+            reasons = find_batch_conflicts(
+                [(items[index].start_time, items[index].end_time) for index in group],
+                busy_by_resource.get(resource_id, []),
+            )
+            for index, reason in zip(group, reasons):
+                if reason:
+                    rejected[index] = reason
+
+    if rejected and batch_in.mode == "all_or_nothing":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Booking conflict: The resource is already booked for the specified time range."
+            detail="Batch rejected: " + "; ".join(f"item {index}: {rejected[index]}" for index in sorted(rejected))
         )
-    total_price = calculate_total_price(booking_in.start_time, booking_in.end_time, resource.price_per_hour)
-    new_booking = await crud.create_booking(db, booking_in, user_id, total_price)
-    return BookingResponse.model_validate(new_booking)
+    accepted = [index for index in range(len(items)) if index not in rejected]
+    rows = [
+        {
+            "resource_id": items[index].resource_id,
+            "user_id": user_id,
+            "start_time": items[index].start_time,
+            "end_time": items[index].end_time,
+        }
+        for index in accepted
+    ]
+    created = []
+    if rows:
+        try:
+            created = [BookingResponse.model_validate(booking) for booking in await crud.create_bookings(db, rows)]
+        except IntegrityError as e:
+            # lost a race with a concurrent booking after the range check
+            await db.rollback()
+            if not crud.is_booking_conflict(e):
+                raise
+            if batch_in.mode == "all_or_nothing":
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Booking conflict: The resource is already booked for the specified time range."
+                )
+            # the multi-row INSERT fails as a whole; book the rows one by one so
+            # only the ones that still collide are rejected
+            created = await _create_bookings_one_by_one(db, items, accepted, user_id, facility_id, rejected)
+    return BookingBatchResponse(
+        created=created,
+        rejected=[
+            BookingBatchRejection(
+                index=index,
+                resource_id=items[index].resource_id,
+                start_time=items[index].start_time,
+                end_time=items[index].end_time,
+                reason=reason,
+            )
+            for index, reason in sorted(rejected.items())
+        ],
+    )
 
 async def update_booking_service(db: AsyncSession, booking_id: UUID, booking_in: BookingUpdate) -> BookingResponse:
     booking = await crud.get_booking_by_id(db, booking_id)
@@ -273,29 +694,127 @@ async def update_booking_service(db: AsyncSession, booking_id: UUID, booking_in:
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Booking not found."
         )
-    resource = await crud.get_resource_by_id(db, booking.resource_id)
-    if booking_in.resource_id:
-        resource = await crud.get_resource_by_id(db, booking_in.resource_id)
-        if not resource:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Resource not found."
-            )
     start_time = booking_in.start_time if booking_in.start_time else booking.start_time
     end_time = booking_in.end_time if booking_in.end_time else booking.end_time
-    check_conflict = await crud.check_booking_conflict(db, booking_in.resource_id or booking.resource_id, start_time, end_time, exclude_booking_id=booking_id)
-    if check_conflict:
+    if end_time <= start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Booking end time must be after start time."
+        )
+    priced = await crud.get_resource_with_price(db, booking_in.resource_id or booking.resource_id, start_time, end_time)
+    if not priced:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resource not found."
+        )
+    resource, total_price, series_conflict = priced
+    if series_conflict:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Booking conflict: The resource is already booked for the specified time range."
         )
-    total_price = calculate_total_price(start_time, end_time, resource.price_per_hour)
-    updated_booking = await crud.update_booking(db, booking, booking_in)
-    updated_booking.total_price = total_price
-    await db.commit()
-    await db.refresh(updated_booking)
+    # overlaps with other bookings are rejected by the exclusion constraint, no pre-check query
+    try:
+        updated_booking = await crud.update_booking(db, booking, booking_in, float(total_price))
+    except IntegrityError as e:
+        await db.rollback()
+        if crud.is_booking_conflict(e):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Booking conflict: The resource is already booked for the specified time range."
+            )
+        raise
     return BookingResponse.model_validate(updated_booking)
 
+SERIES_MAX_SPAN = timedelta(days=2 * 366)
+
+async def create_booking_series_service(db: AsyncSession, series_in: BookingSeriesCreate, user_id: UUID, facility_id: UUID) -> BookingSeriesResponse:
+    if series_in.end_time <= series_in.start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Booking end time must be after start time."
+        )
+    if series_in.count is None and series_in.until is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A recurring booking needs either a count or an until date."
+        )
+    if series_in.until is not None and series_in.until < series_in.start_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Until must not be before the first occurrence."
+        )
+    step = series_step(series_in.frequency, series_in.interval)
+    if series_in.end_time - series_in.start_time > step:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each occurrence must end before the next one starts."
+        )
+    ends_at = series_ends_at(series_in.start_time, series_in.end_time, step, series_in.count, series_in.until)
+    if ends_at - series_in.start_time > SERIES_MAX_SPAN:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A recurring booking can span at most two years."
+        )
+
+    locked = await crud.lock_resource(db, series_in.resource_id, facility_id, series_in.start_time, series_in.end_time)
+    if not locked:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resource not found in the specified facility."
+        )
+    resource, price = locked
+    # one range query for bookings and one for other series over the whole span,
+    # then a single sweep of the occurrences against them
+    busy_by_resource = {resource.id: list(await crud.get_booked_intervals_by_resource_id(db, resource.id, series_in.start_time, ends_at))}
+    series_list = await crud.get_series_by_resource_ids(db, [resource.id], series_in.start_time, ends_at)
+    _add_series_occurrences(busy_by_resource, series_list, series_in.start_time, ends_at)
+    occurrences = expand_series(series_in.start_time, series_in.end_time, step, ends_at, series_in.start_time, ends_at)
+    reasons = find_batch_conflicts(occurrences, busy_by_resource[resource.id])
+    conflicts = [start for (start, _), reason in zip(occurrences, reasons) if reason]
+    if conflicts:
+        await db.rollback()
+        shown = ", ".join(start.isoformat() for start in conflicts[:5])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Booking conflict: {len(conflicts)} occurrence(s) overlap existing bookings, starting {shown}."
+        )
+    new_series = await crud.create_booking_series(db, series_in, user_id, ends_at, float(price))
+    return BookingSeriesResponse.model_validate(new_series)
+
+async def _get_owned_series(db: AsyncSession, series_id: UUID, current_user: UserResponse):
+    series = await crud.get_booking_series_by_id(db, series_id)
+    if not series or (series.user_id != current_user.id and not current_user.is_superuser):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recurring booking not found."
+        )
+    return series
+
+async def get_booking_series_service(db: AsyncSession, series_id: UUID, current_user: UserResponse) -> BookingSeriesResponse:
+    series = await _get_owned_series(db, series_id, current_user)
+    return BookingSeriesResponse.model_validate(series)
+
+async def get_booking_series_occurrences_service(db: AsyncSession, series_id: UUID, current_user: UserResponse, window_start: datetime | None, window_end: datetime | None) -> list[TimeInterval]:
+    series = await _get_owned_series(db, series_id, current_user)
+    occurrences = expand_series(
+        series.first_start,
+        series.first_end,
+        series_step(series.frequency, series.interval),
+        series.ends_at,
+        window_start or series.first_start,
+        window_end or series.ends_at,
+    )
+    return [TimeInterval(start_time=start, end_time=end) for start, end in occurrences]
+
+async def get_booking_series_by_user_id_service(db: AsyncSession, user_id: UUID, pagination: PaginationParams) -> list[BookingSeriesResponse] | CursorPage[BookingSeriesResponse]:
+    series = await crud.get_series_by_user_id(db, user_id, **_page_args(pagination, "first_start"))
+    return _page_response(series, pagination, BookingSeriesResponse, "first_start")
+
+async def delete_booking_series_service(db: AsyncSession, series_id: UUID, current_user: UserResponse):
+    series = await _get_owned_series(db, series_id, current_user)
+    await crud.delete_booking_series(db, series)
+
 async def get_booking_by_id_service(db: AsyncSession, booking_id: UUID, current_user: UserResponse) -> BookingResponse:
     booking = await crud.get_booking_by_id(db, booking_id)
     if not booking:
@@ -310,24 +829,96 @@ async def get_booking_by_id_service(db: AsyncSession, booking_id: UUID, current_
         )
     return BookingResponse.model_validate(booking)
 
-async def get_bookings_by_user_id_service(db: AsyncSession, user_id: UUID, pagination: PaginationParams) -> list[BookingResponse]:
-    offset = (pagination.page - 1) * pagination.page_size
-    limit = pagination.page_size
-    bookings = await crud.get_bookings_by_user_id(db, user_id, limit=limit, offset=offset)
-    return [BookingResponse.model_validate(booking) for booking in bookings]
+async def get_booking_validators_service(db: AsyncSession, booking_id: UUID, current_user: UserResponse) -> Validators | None:
+    # None (missing or not ours) falls through to the regular lookup and its 404/403
+    changed_at = await crud.get_booking_version(db, booking_id, None if current_user.is_superuser else current_user.id)
+    return object_validators(booking_id, changed_at) if changed_at else None
+
+async def get_bookings_validators_service(db: AsyncSession, pagination: PaginationParams, user_id: UUID | None = None, resource_id: UUID | None = None, facility_id: UUID | None = None, expand: frozenset[str] = frozenset()) -> Validators | None:
+    # embedded resource/facility names can change without any booking changing,
+    # so expanded lists are not revalidated from the bookings version
+    if expand:
+        return None
+    page = await crud.get_bookings_version(db, **_page_args(pagination, "start_time"), user_id=user_id, resource_id=resource_id, facility_id=facility_id)
+    return list_validators(f"bookings:{user_id}:{resource_id}:{facility_id}", page, _list_cache_key(pagination))
+
+async def get_bookings_by_user_id_service(db: AsyncSession, user_id: UUID, pagination: PaginationParams, expand: frozenset[str] = frozenset()) -> list[BookingResponse] | CursorPage[BookingResponse]:
+    bookings = await crud.get_bookings_by_user_id(db, user_id, **_page_args(pagination, "start_time"), expand=expand)
+    return _booking_page_response(bookings, pagination, expand)
+
 
+async def get_bookings_by_resource_id_service(db: AsyncSession, resource_id: UUID, pagination: PaginationParams) -> list[BookingResponse] | CursorPage[BookingResponse]:
+    bookings = await crud.get_bookings_by_resource_id(db, resource_id, **_page_args(pagination, "start_time"))
+    return _page_response(bookings, pagination, BookingResponse, "start_time")
 
-async def get_bookings_by_resource_id_service(db: AsyncSession, resource_id: UUID, pagination: PaginationParams) -> list[BookingResponse]:
-    offset = (pagination.page - 1) * pagination.page_size
-    limit = pagination.page_size
-    bookings = await crud.get_bookings_by_resource_id(db, resource_id, limit=limit, offset=offset)
-    return [BookingResponse.model_validate(booking) for booking in bookings]
+async def get_bookings_by_facility_id_service(db: AsyncSession, facility_id: UUID, pagination: PaginationParams, expand: frozenset[str] = frozenset()) -> list[BookingResponse] | CursorPage[BookingResponse]:
+    bookings = await crud.get_bookings_by_facility_id(db, facility_id, **_page_args(pagination, "start_time"), expand=expand)
+    return _booking_page_response(bookings, pagination, expand)
 
-async def get_bookings_by_facility_id_service(db: AsyncSession, facility_id: UUID, pagination: PaginationParams) -> list[BookingResponse]:
-    offset = (pagination.page - 1) * pagination.page_size
-    limit = pagination.page_size
-    bookings = await crud.get_bookings_by_facility_id(db, facility_id, limit=limit, offset=offset)
-    return [BookingResponse.model_validate(booking) for booking in bookings]
+async def get_facility_availability_grid_service(db: AsyncSession, facility_id: UUID, params: AvailabilityParams) -> FacilityAvailabilityGridResponse:
+    facility = await crud.get_facility_by_id(db, facility_id)
+    if not facility:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Facility not found."
+        )
+    window_start, window_end = get_opening_window(params.date, facility.open_at, facility.close_at)
+    slot_count = (window_end - window_start) // timedelta(minutes=params.slot_minutes)
+    rows = await crud.get_booked_intervals_by_facility_id(db, facility_id, window_start, window_end)
+    names: dict[UUID, str] = {}
+    busy_by_resource: dict[UUID, list[tuple[datetime, datetime]]] = {}
+    for resource_id, name, start_time, end_time in rows:
+        names[resource_id] = name
+        busy = busy_by_resource.setdefault(resource_id, [])
+        if start_time is not None:
+            busy.append((start_time, end_time))
+    series_list = await crud.get_series_by_facility_id(db, facility_id, window_start, window_end)
+    _add_series_occurrences(busy_by_resource, series_list, window_start, window_end)
+    resources = []
+    for resource_id, busy in busy_by_resource.items():
+        mask = build_slot_mask(window_start, slot_count, params.slot_minutes, busy)
+        resources.append(ResourceSlotMask(resource_id=resource_id, name=names[resource_id], booked=slot_mask_to_str(mask, slot_count)))
+    return FacilityAvailabilityGridResponse(
+        facility_id=facility_id,
+        date=params.date,
+        slot_minutes=params.slot_minutes,
+        window_start=window_start,
+        window_end=window_end,
+        slot_count=slot_count,
+        resources=resources,
+    )
+
+
+async def get_facility_stats_service(db: AsyncSession, facility_id: UUID, params: StatsParams) -> FacilityStatsResponse:
+    facility = await crud.get_facility_by_id(db, facility_id)
+    if not facility:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Facility not found."
+        )
+    # reads only booking_rollups, never the bookings themselves
+    rows = await crud.get_facility_rollups(db, facility_id, params.granularity, params.window_start, params.window_end)
+    open_start, open_end = get_opening_window(params.window_start, facility.open_at, facility.close_at)
+    open_minutes_per_day = (open_end - open_start) / timedelta(minutes=1)
+    periods = []
+    for row in rows:
+        # the first and last periods may be cut short by the requested window
+        days = (min(period_end(row.period_start, params.granularity), params.window_end) - max(row.period_start, params.window_start)).days
+        periods.append(ResourceStatsPeriod(
+            resource_id=row.resource_id,
+            period_start=row.period_start,
+            booking_count=row.booking_count,
+            revenue=row.revenue,
+            booked_hours=round(row.booked_minutes / 60, 2),
+            utilization=round(row.booked_minutes / (open_minutes_per_day * days), 4),
+        ))
+    return FacilityStatsResponse(
+        facility_id=facility_id,
+        granularity=params.granularity,
+        window_start=params.window_start,
+        window_end=params.window_end,
+        periods=periods,
+    )
 
 
 async def delete_booking_service(db: AsyncSession, booking_id: UUID):
@@ -339,9 +930,25 @@ async def delete_booking_service(db: AsyncSession, booking_id: UUID):
         )
     await crud.delete_booking(db, booking)
 
-async def get_all_bookings_service(db: AsyncSession, pagination: PaginationParams) -> list[BookingResponse]:
-    offset = (pagination.page - 1) * pagination.page_size
-    limit = pagination.page_size
-    bookings = await crud.get_all_bookings(db, limit=limit, offset=offset)
-    return [BookingResponse.model_validate(booking) for booking in bookings]
+async def get_all_bookings_service(db: AsyncSession, pagination: PaginationParams) -> list[BookingResponse] | CursorPage[BookingResponse]:
+    bookings = await crud.get_all_bookings(db, **_page_args(pagination, "start_time"))
+    return _page_response(bookings, pagination, BookingResponse, "start_time", _from_row(BookingResponse))
+
+EXPORT_BATCH_SIZE = 2000
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+async def export_bookings_service(db: AsyncSession, params: BookingExportParams) -> AsyncIterator[bytes]:
+    """Encode the bookings matching params one database batch at a time."""
+    if params.format == "csv":
+        yield _csv_chunk([[column.key for column in crud.response_columns(Bookings, BookingResponse)]])
+    async for rows in crud.stream_bookings(db, params, EXPORT_BATCH_SIZE):
+        if params.format == "csv":
+            yield _csv_chunk(rows)
+        else:
+            yield b"".join(to_json(row._asdict()) + b"\n" for row in rows)
 
@@ -1,15 +1,257 @@
-from src.schemas import PaginationParams
-from fastapi import Query
-from datetime import datetime, timezone
+from src.schemas import PaginationParams, AvailabilityParams, FacilitySearchParams, NearbyParams, BookingExportParams, StatsParams
+from fastapi import Query, HTTPException, status
+from uuid import UUID
+import base64
+import math
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from collections.abc import Iterable
+from typing import Literal
 
 
 def get_pagination(
         page: int = Query(1, ge=1, description="Page number (starting from 1)"),
-        page_size: int = Query(10, ge=1, le=100, description="Number of items per page (1-100)")
+        page_size: int = Query(10, ge=1, le=100, description="Number of items per page (1-100)"),
+        cursor: str | None = Query(None, description="Keyset cursor from a previous next_cursor; pass an empty value for the first page")
 ) -> PaginationParams:
-    return PaginationParams(page=page, page_size=page_size)
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor."
+            )
+    return PaginationParams(page=page, page_size=page_size, cursor=cursor)
 
-def calculate_total_price(start_time: datetime, end_time: datetime, price_per_hour: float) -> float:
-    duration = end_time - start_time
-    hours = duration.total_seconds() / 3600
-    return round(hours * price_per_hour, 2)
+# sort keys whose values are numbers; every other sort key is a timestamp
+NUMERIC_SORT_KEYS = {"search_rank"}
+
+def encode_cursor(sort_key: str, sort_value: datetime | float, row_id: UUID) -> str:
+    # the sort key travels with the value, so a cursor is only accepted by a
+    # list sorted the same way; datetimes as ISO strings, ranks as plain numbers
+    raw = json.dumps([sort_key, sort_value.isoformat() if isinstance(sort_value, datetime) else sort_value, str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str | None, sort_key: str | None = None) -> tuple[datetime | float, UUID] | None:
+    # "" / None mean "first page"; anything else must be a cursor we issued,
+    # for a list sorted by `sort_key` when one is given
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, sort_value, row_id = json.loads(raw)
+        if not isinstance(key, str) or (sort_key is not None and key != sort_key):
+            raise ValueError("cursor is for a different sort order")
+        if key in NUMERIC_SORT_KEYS:
+            if isinstance(sort_value, bool) or not isinstance(sort_value, int | float):
+                raise ValueError("expected a numeric sort value")
+            return float(sort_value), UUID(row_id)
+        return datetime.fromisoformat(sort_value), UUID(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("invalid cursor") from e
+
+def get_availability_params(
+        day: date | None = Query(None, alias="date", description="Day to check (defaults to today)"),
+        slot_minutes: int = Query(60, ge=5, le=24 * 60, description="Slot length in minutes (5-1440)")
+) -> AvailabilityParams:
+    return AvailabilityParams(date=day or date.today(), slot_minutes=slot_minutes)
+
+def get_facility_search_params(
+        q: str | None = Query(None, max_length=200, description="Words to match in name, city or address"),
+        city: str | None = Query(None),
+        state: str | None = Query(None),
+        open_at: time | None = Query(None, description="Only facilities open at this time of day"),
+        amenity: list[str] = Query([], description="Required amenities; repeat for several")
+) -> FacilitySearchParams:
+    return FacilitySearchParams(q=(q or "").strip() or None, city=city, state=state, open_at=open_at, amenities=amenity)
+
+def get_nearby_params(
+        lat: float = Query(..., ge=-90, le=90),
+        lon: float = Query(..., ge=-180, le=180),
+        radius_km: float = Query(10, gt=0, le=200, description="Search radius in kilometres (up to 200)"),
+        limit: int = Query(20, ge=1, le=100, description="Maximum number of facilities, nearest first"),
+        availability: bool = Query(False, description="Include today's free time per resource")
+) -> NearbyParams:
+    return NearbyParams(lat=lat, lon=lon, radius_km=radius_km, limit=limit, availability=availability)
+
+def get_booking_export_params(
+        format: Literal["csv", "ndjson"] = Query("csv"),
+        window_start: datetime | None = Query(None, alias="from", description="Bookings starting at or after this time"),
+        window_end: datetime | None = Query(None, alias="to", description="Bookings starting before this time"),
+        facility_id: UUID | None = Query(None),
+        resource_id: UUID | None = Query(None)
+) -> BookingExportParams:
+    if window_start and window_end and window_end <= window_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must be after 'from'."
+        )
+    return BookingExportParams(format=format, window_start=window_start, window_end=window_end, facility_id=facility_id, resource_id=resource_id)
+
+STATS_MAX_DAYS = 366
+
+def get_stats_params(
+        granularity: Literal["day", "week", "month"] = Query("day"),
+        window_start: date | None = Query(None, alias="from", description="First day (defaults to 30 days ago)"),
+        window_end: date | None = Query(None, alias="to", description="Day after the last one (defaults to tomorrow)")
+) -> StatsParams:
+    window_end = window_end or date.today() + timedelta(days=1)
+    window_start = window_start or window_end - timedelta(days=30)
+    if window_end <= window_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must be after 'from'."
+        )
+    if (window_end - window_start).days > STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stats cover at most {STATS_MAX_DAYS} days."
+        )
+    return StatsParams(granularity=granularity, window_start=window_start, window_end=window_end)
+
+def period_end(period_start: date, granularity: str) -> date:
+    if granularity == "day":
+        return period_start + timedelta(days=1)
+    if granularity == "week":
+        return period_start + timedelta(weeks=1)
+    return (period_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+EARTH_RADIUS_KM = 6371.0088
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> tuple[float, float, list[tuple[float, float]]]:
+    """Latitude range and longitude range(s) enclosing a circle on the sphere.
+
+    The longitude span is split in two when it crosses the antimeridian, and
+    is the full circle when the circle reaches a pole.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+    delta_lon = math.degrees(math.asin(math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))))
+    min_lon, max_lon = lon - delta_lon, lon + delta_lon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+BOOKING_EXPANSIONS = {"resource", "facility"}
+
+def get_booking_expand(
+        expand: str | None = Query(None, description="Comma separated related objects to embed: resource, facility")
+) -> frozenset[str]:
+    requested = {part.strip() for part in (expand or "").split(",") if part.strip()}
+    unknown = requested - BOOKING_EXPANSIONS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown expand option(s): {', '.join(sorted(unknown))}."
+        )
+    # the facility is reached through the resource
+    if "facility" in requested:
+        requested.add("resource")
+    return frozenset(requested)
+
+def get_opening_window(day: date, open_at: time | None, close_at: time | None) -> tuple[datetime, datetime]:
+    # facilities without opening hours are bookable around the clock; a close_at
+    # at or before open_at means the facility closes after midnight
+    if open_at is None or close_at is None:
+        start = datetime.combine(day, time.min)
+        return start, start + timedelta(days=1)
+    start = datetime.combine(day, open_at)
+    end = datetime.combine(day, close_at)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+def compute_free_intervals(window_start: datetime, window_end: datetime, busy: Iterable[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    # single sweep over busy intervals sorted by start time; overlapping and
+    # touching bookings are merged implicitly by only ever moving the cursor forward
+    free = []
+    cursor = window_start
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start > cursor:
+            free.append((cursor, min(start, window_end)))
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            break
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+def split_into_slots(window_start: datetime, free: Iterable[tuple[datetime, datetime]], slot_minutes: int) -> list[tuple[datetime, datetime]]:
+    # slots are aligned to a grid anchored at window_start (the opening time)
+    step = timedelta(minutes=slot_minutes)
+    slots = []
+    for start, end in free:
+        offset = (start - window_start) % step
+        slot_start = start + (step - offset) if offset else start
+        while slot_start + step <= end:
+            slots.append((slot_start, slot_start + step))
+            slot_start += step
+    return slots
+
+def build_slot_mask(window_start: datetime, slot_count: int, slot_minutes: int, busy: Iterable[tuple[datetime, datetime]]) -> bytearray:
+    # one bit per slot (slot 0 is the high bit of byte 0); a slot is booked
+    # when any booking overlaps it, even partially
+    mask = bytearray((slot_count + 7) // 8)
+    step = timedelta(minutes=slot_minutes)
+    for start, end in busy:
+        first = max(0, (start - window_start) // step)
+        last = min(slot_count, -((window_start - end) // step))
+        for slot in range(first, last):
+            mask[slot >> 3] |= 0x80 >> (slot & 7)
+    return mask
+
+def slot_mask_to_str(mask: bytearray, slot_count: int) -> str:
+    bits = "".join(f"{byte:08b}" for byte in mask)
+    return bits[:slot_count]
+
+def find_batch_conflicts(requested: list[tuple[datetime, datetime]], existing: list[tuple[datetime, datetime]]) -> list[str | None]:
+    # both lists sorted by start time and for a single resource; returns a
+    # rejection reason (or None) per requested interval. Existing bookings never
+    # overlap each other, so only the first one that ends after a request starts
+    # can collide with it. Within the request, earlier-starting intervals win.
+    reasons: list[str | None] = []
+    pos = 0
+    accepted_until = None
+    for start, end in requested:
+        while pos < len(existing) and existing[pos][1] <= start:
+            pos += 1
+        if pos < len(existing) and existing[pos][0] < end:
+            reasons.append("Booking conflict: The resource is already booked for the specified time range.")
+        elif accepted_until is not None and start < accepted_until:
+            reasons.append("Booking conflict: Overlaps another booking in the same request.")
+        else:
+            reasons.append(None)
+            accepted_until = end
+    return reasons
+
+SERIES_FREQUENCY_DAYS = {"daily": 1, "weekly": 7}
+
+def series_step(frequency: str, interval: int) -> timedelta:
+    return timedelta(days=SERIES_FREQUENCY_DAYS[frequency] * interval)
+
+def series_ends_at(first_start: datetime, first_end: datetime, step: timedelta, count: int | None, until: datetime | None) -> datetime:
+    # end of the last occurrence allowed by count and/or until (whichever is earlier)
+    last = count - 1 if count is not None else None
+    if until is not None:
+        last_until = (until - first_start) // step
+        last = last_until if last is None else min(last, last_until)
+    return first_end + last * step
+
+def expand_series(first_start: datetime, first_end: datetime, step: timedelta, ends_at: datetime, window_start: datetime, window_end: datetime) -> list[tuple[datetime, datetime]]:
+    # jump straight to the first occurrence ending after window_start instead of
+    # walking the series from the beginning
+    duration = first_end - first_start
+    k = max(0, (window_start - first_start - duration) // step + 1)
+    occurrences = []
+    start = first_start + k * step
+    while start < window_end and start + duration <= ends_at:
+        occurrences.append((start, start + duration))
+        start += step
+    return occurrences
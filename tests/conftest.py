@@ -0,0 +1,80 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import src.models  # noqa: F401  registers the tables on Base.metadata
+from src import crud
+from src.core.db import Base
+from src.main import app
+from src.router.depandency import get_db, get_read_db
+from src.schemas import FacilityCreate, ResourceCreate, UserSignup
+
+# a throwaway database: the tables are dropped and recreated for the session
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def _create_schema(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        # the booking exclusion constraint needs btree_gist, as in the migrations
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    # NullPool: every test runs on its own event loop
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    asyncio.run(_create_schema(engine))
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+async def db(db_engine):
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    async with db_engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {tables} CASCADE"))
+    async with async_sessionmaker(bind=db_engine, expire_on_commit=False)() as session:
+        yield session
+
+
+@pytest.fixture
+async def client(db, db_engine):
+    sessions = async_sessionmaker(bind=db_engine, expire_on_commit=False)
+
+    async def test_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = app.dependency_overrides[get_read_db] = test_db
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def facility(db):
+    return await crud.create_facility(db, FacilityCreate(name="Center Court", state="CA", city="Oakland", address="1 Main St"))
+
+
+@pytest.fixture
+async def resource(db, facility):
+    return await crud.create_resource(db, ResourceCreate(facility_id=facility.id, name="Court 1", price_per_hour=20))
+
+
+@pytest.fixture
+async def user(db):
+    return await crud.create_user(db, UserSignup(full_name="Sam Player", email="sam@example.com", password="secret"))
@@ -0,0 +1,85 @@
+from datetime import date, datetime, time, timedelta
+
+from src.utils import build_slot_mask, compute_free_intervals, get_opening_window, slot_mask_to_str, split_into_slots
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2030, 1, 1, hour, minute)
+
+
+OPEN, CLOSE = at(8), at(22)
+
+
+def test_no_bookings_leaves_the_whole_window_free():
+    assert compute_free_intervals(OPEN, CLOSE, []) == [(OPEN, CLOSE)]
+
+
+def test_overlapping_and_touching_bookings_merge():
+    busy = [(at(9), at(10)), (at(9, 30), at(11)), (at(11), at(12)), (at(14), at(15))]
+    assert compute_free_intervals(OPEN, CLOSE, busy) == [(OPEN, at(9)), (at(12), at(14)), (at(15), CLOSE)]
+
+
+def test_booking_inside_another_does_not_move_the_cursor_back():
+    busy = [(at(9), at(13)), (at(10), at(11))]
+    assert compute_free_intervals(OPEN, CLOSE, busy) == [(OPEN, at(9)), (at(13), CLOSE)]
+
+
+def test_bookings_past_opening_and_closing_are_clipped():
+    busy = [(at(6), at(9)), (at(21), datetime(2030, 1, 2, 1))]
+    assert compute_free_intervals(OPEN, CLOSE, busy) == [(at(9), at(21))]
+
+
+def test_bookings_outside_the_window_are_ignored():
+    busy = [(at(5), at(7)), (at(22), at(23))]
+    assert compute_free_intervals(OPEN, CLOSE, busy) == [(OPEN, CLOSE)]
+
+
+def test_fully_booked_day_has_no_free_time_or_slots():
+    busy = [(at(7), at(15)), (at(15), at(23))]
+    assert compute_free_intervals(OPEN, CLOSE, busy) == []
+    assert split_into_slots(OPEN, [], 60) == []
+
+
+def test_slots_stay_on_the_grid_anchored_at_opening():
+    free = [(at(8, 30), at(11)), (at(12), at(12, 45))]
+    assert split_into_slots(OPEN, free, 60) == [(at(9), at(10)), (at(10), at(11))]
+    assert split_into_slots(OPEN, free, 30) == [(at(8, 30), at(9)), (at(9), at(9, 30)), (at(9, 30), at(10)), (at(10), at(10, 30)), (at(10, 30), at(11)), (at(12), at(12, 30))]
+
+
+def test_opening_window_past_midnight_and_around_the_clock():
+    assert get_opening_window(date(2030, 1, 1), time(18), time(2)) == (at(18), datetime(2030, 1, 2, 2))
+    assert get_opening_window(date(2030, 1, 1), None, None) == (at(0), datetime(2030, 1, 2))
+
+
+def slots(mask: bytearray, slot_count: int) -> str:
+    return slot_mask_to_str(mask, slot_count)
+
+
+def test_booking_covering_part_of_a_slot_marks_the_whole_slot():
+    # 08:00-10:00 in 30 minute slots; 08:40-09:10 touches slots 1 and 2
+    mask = build_slot_mask(OPEN, 4, 30, [(at(8, 40), at(9, 10))])
+    assert slots(mask, 4) == "0110"
+
+
+def test_bookings_at_the_first_and_last_slot():
+    # 14 hourly slots, so the mask spans two bytes
+    mask = build_slot_mask(OPEN, 14, 60, [(at(7), at(8, 30)), (at(21, 59), at(23))])
+    assert slots(mask, 14) == "10000000000001"
+    assert len(mask) == 2
+
+
+def test_touching_booking_does_not_mark_the_neighbouring_slot():
+    mask = build_slot_mask(OPEN, 4, 60, [(at(9), at(10))])
+    assert slots(mask, 4) == "0100"
+
+
+def test_slot_minutes_that_do_not_divide_the_window():
+    # 08:00-22:00 in 45 minute slots is 18 whole slots; the 30 minutes after
+    # the last one are not a slot and bookings there mark nothing
+    window_start, window_end = get_opening_window(date(2030, 1, 1), time(8), time(22))
+    slot_count = (window_end - window_start) // timedelta(minutes=45)
+    assert slot_count == 18
+    mask = build_slot_mask(window_start, slot_count, 45, [(at(21, 40), at(22))])
+    assert slots(mask, slot_count) == "0" * 18
+    mask = build_slot_mask(window_start, slot_count, 45, [(at(21, 0), at(22))])
+    assert slots(mask, slot_count) == "0" * 17 + "1"
@@ -0,0 +1,97 @@
+from datetime import datetime
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from src import crud, service
+from src.models import Bookings
+from src.schemas import BookingBatchCreate, BookingCreate
+from src.utils import find_batch_conflicts
+
+EXISTING = "Booking conflict: The resource is already booked for the specified time range."
+IN_BATCH = "Booking conflict: Overlaps another booking in the same request."
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2030, 1, 1, hour, minute)
+
+
+def test_sweep_accepts_touching_intervals():
+    assert find_batch_conflicts([(at(9), at(10)), (at(10), at(11))], [(at(8), at(9)), (at(11), at(12))]) == [None, None]
+
+
+def test_sweep_rejects_overlaps_inside_the_batch_earliest_wins():
+    requested = [(at(9), at(11)), (at(10), at(12)), (at(10, 30), at(10, 45)), (at(11), at(12))]
+    assert find_batch_conflicts(requested, []) == [None, IN_BATCH, IN_BATCH, None]
+
+
+def test_sweep_rejects_overlaps_with_existing_bookings():
+    requested = [(at(8), at(9)), (at(9, 30), at(10, 30)), (at(12), at(13)), (at(14), at(16))]
+    existing = [(at(9), at(10)), (at(11), at(12)), (at(15), at(15, 30))]
+    assert find_batch_conflicts(requested, existing) == [None, EXISTING, None, EXISTING]
+
+
+def batch(resource_id: UUID, *slots, mode="all_or_nothing") -> BookingBatchCreate:
+    return BookingBatchCreate(mode=mode, bookings=[BookingCreate(resource_id=resource_id, start_time=start, end_time=end) for start, end in slots])
+
+
+async def booking_count(db) -> int:
+    return await db.scalar(select(func.count()).select_from(Bookings))
+
+
+@pytest.mark.anyio
+async def test_all_or_nothing_rejects_the_batch_on_an_inner_conflict(db, facility, resource, user):
+    with pytest.raises(HTTPException) as exc:
+        await service.create_bookings_batch_service(db, batch(resource.id, (at(9), at(10)), (at(9, 30), at(11))), user.id, facility.id)
+    assert exc.value.status_code == 400
+    assert "item 1" in exc.value.detail
+    assert await booking_count(db) == 0
+
+
+@pytest.mark.anyio
+async def test_all_or_nothing_rejects_the_batch_on_an_existing_booking(db, facility, resource, user):
+    await service.create_booking_service(db, BookingCreate(resource_id=resource.id, start_time=at(12), end_time=at(13)), user.id, facility.id)
+    with pytest.raises(HTTPException) as exc:
+        await service.create_bookings_batch_service(db, batch(resource.id, (at(9), at(10)), (at(12, 30), at(14))), user.id, facility.id)
+    assert exc.value.status_code == 400
+    assert await booking_count(db) == 1
+
+
+@pytest.mark.anyio
+async def test_partial_books_what_fits(db, facility, resource, user):
+    await service.create_booking_service(db, BookingCreate(resource_id=resource.id, start_time=at(12), end_time=at(13)), user.id, facility.id)
+    response = await service.create_bookings_batch_service(
+        db,
+        batch(resource.id, (at(9), at(10)), (at(9, 30), at(11)), (at(12, 30), at(14)), (at(14), at(15)), mode="partial"),
+        user.id,
+        facility.id,
+    )
+    assert [(b.start_time, b.total_price) for b in response.created] == [(at(9), 20), (at(14), 20)]
+    assert [(r.index, r.reason) for r in response.rejected] == [(1, IN_BATCH), (2, EXISTING)]
+    assert await booking_count(db) == 3
+
+
+@pytest.mark.anyio
+async def test_partial_rejects_only_the_item_that_lost_a_race(db, facility, resource, user, monkeypatch):
+    # the fallback rolls back, which expires the fixtures
+    facility_id, resource_id, user_id = facility.id, resource.id, user.id
+    await service.create_booking_service(db, BookingCreate(resource_id=resource.id, start_time=at(12), end_time=at(13)), user.id, facility.id)
+
+    # the concurrent booking lands between the range check and the INSERT
+    async def nothing_booked(*args, **kwargs):
+        return []
+
+    monkeypatch.setattr(crud, "get_booked_intervals_by_resource_ids", nothing_booked)
+    response = await service.create_bookings_batch_service(
+        db, batch(resource_id, (at(9), at(10)), (at(12, 30), at(14)), (at(14), at(15)), mode="partial"), user_id, facility_id
+    )
+    assert [b.start_time for b in response.created] == [at(9), at(14)]
+    assert [(r.index, r.reason) for r in response.rejected] == [(1, EXISTING)]
+    assert await booking_count(db) == 3
+
+    with pytest.raises(HTTPException) as exc:
+        await service.create_bookings_batch_service(db, batch(resource_id, (at(16), at(17)), (at(12), at(12, 30))), user_id, facility_id)
+    assert exc.value.status_code == 400
+    assert await booking_count(db) == 3
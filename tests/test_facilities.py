@@ -0,0 +1,41 @@
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from src import crud, service
+from src.schemas import FacilityCreate, FacilityUpdate
+
+
+def facility_in(**fields) -> FacilityCreate:
+    return FacilityCreate(name="Center Court", state="CA", city="Oakland", address="1 Main St", **fields)
+
+
+def test_create_accepts_both_or_neither_coordinate():
+    assert facility_in().latitude is None
+    assert facility_in(latitude=37.8, longitude=-122.27).longitude == -122.27
+
+
+@pytest.mark.parametrize("fields", [{"latitude": 37.8}, {"longitude": -122.27}])
+def test_create_rejects_a_single_coordinate(fields):
+    with pytest.raises(ValidationError, match="latitude and longitude"):
+        facility_in(**fields)
+
+
+@pytest.mark.anyio
+async def test_update_checks_coordinates_against_the_stored_row(db):
+    facility = await crud.create_facility(db, facility_in())
+    with pytest.raises(HTTPException) as exc:
+        await service.update_facility_service(db, facility.id, FacilityUpdate(latitude=37.8))
+    assert exc.value.status_code == 400
+
+    updated = await service.update_facility_service(db, facility.id, FacilityUpdate(latitude=37.8, longitude=-122.27))
+    assert (updated.latitude, updated.longitude) == (37.8, -122.27)
+    # one coordinate alone is fine once the row has the other
+    updated = await service.update_facility_service(db, facility.id, FacilityUpdate(latitude=37.9))
+    assert (updated.latitude, updated.longitude) == (37.9, -122.27)
+
+    with pytest.raises(HTTPException) as exc:
+        await service.update_facility_service(db, facility.id, FacilityUpdate(longitude=None))
+    assert exc.value.status_code == 400
+    cleared = await service.update_facility_service(db, facility.id, FacilityUpdate(latitude=None, longitude=None))
+    assert cleared.latitude is None and cleared.longitude is None
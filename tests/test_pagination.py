@@ -0,0 +1,83 @@
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+
+import pytest
+
+from src import service
+from src.models import Facilities
+from src.schemas import PaginationParams
+from src.utils import decode_cursor, encode_cursor
+
+ROW_ID = UUID("6f1c2b1e-0d2a-4a55-9a3e-5b8f3f0e9c11")
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+MALFORMED = [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"{not json").decode(),
+    raw_cursor(["start_time", "2030-01-01T10:00:00"]),
+    raw_cursor(["start_time", "yesterday", str(ROW_ID)]),
+    raw_cursor(["start_time", "2030-01-01T10:00:00", "not-a-uuid"]),
+    raw_cursor(["search_rank", "0.5", str(ROW_ID)]),
+    raw_cursor(["search_rank", True, str(ROW_ID)]),
+    raw_cursor([None, "2030-01-01T10:00:00", str(ROW_ID)]),
+]
+
+
+@pytest.mark.parametrize("sort_key, value", [("start_time", datetime(2030, 1, 1, 10, 30, 15, 250)), ("search_rank", 0.0625)])
+def test_cursor_round_trip(sort_key, value):
+    cursor = encode_cursor(sort_key, value, ROW_ID)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, sort_key) == (value, ROW_ID)
+
+
+def test_empty_cursor_is_the_first_page():
+    assert decode_cursor("") is None
+    assert decode_cursor(None) is None
+
+
+@pytest.mark.parametrize("cursor", MALFORMED)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_cursor_for_another_sort_order_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("search_rank", 0.5, ROW_ID), "created_at")
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cursor", [*MALFORMED, encode_cursor("created_at", datetime(2030, 1, 1), ROW_ID)[:-3] + "!!!"])
+async def test_malformed_cursor_is_a_400(client, cursor):
+    response = await client.get("/api/v1/facilities/search", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor."}
+
+
+@pytest.mark.anyio
+async def test_cursor_from_another_list_is_a_400(client):
+    # a search_rank cursor is well-formed but means nothing to a created_at list
+    response = await client.get("/api/v1/facilities/search", params={"cursor": encode_cursor("search_rank", 0.5, ROW_ID)})
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_pages_have_no_gaps_or_duplicates_on_tied_sort_keys(db):
+    # one transaction, so every row gets the same created_at from now()
+    db.add_all(Facilities(name=f"Court {n}", state="CA", city="Oakland", address=f"{n} Main St") for n in range(7))
+    await db.commit()
+    seen, cursor = [], ""
+    while True:
+        page = await service.get_all_facilities_service(db, PaginationParams(page_size=3, cursor=cursor))
+        seen.extend(facility.id for facility in page.items)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert len(seen) == len(set(seen)) == 7
+    assert seen == sorted(seen)
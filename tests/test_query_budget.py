@@ -0,0 +1,36 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from src import crud, service
+from src.core.db import assert_max_queries
+from src.models import BookingRollups
+from src.schemas import BookingCreate, BookingUpdate, PaginationParams, ResourceCreate
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_resources_by_facility_is_one_query(db, db_engine, facility, resource):
+    with assert_max_queries(1, db_engine):
+        resources = await service.get_resources_by_facility_id_service(db, facility.id, PaginationParams())
+    assert [r.id for r in resources] == [resource.id]
+
+
+async def test_create_booking_is_one_query(db, db_engine, facility, resource, user):
+    booking_in = BookingCreate(resource_id=resource.id, start_time=datetime(2030, 1, 1, 10), end_time=datetime(2030, 1, 1, 11))
+    with assert_max_queries(1, db_engine):
+        booking = await service.create_booking_service(db, booking_in, user.id, facility.id)
+    assert booking.total_price == 20
+
+
+async def test_update_booking_is_three_queries(db, db_engine, facility, resource, user):
+    other = await crud.create_resource(db, ResourceCreate(facility_id=facility.id, name="Court 2", price_per_hour=30))
+    booking_in = BookingCreate(resource_id=resource.id, start_time=datetime(2030, 1, 1, 10), end_time=datetime(2030, 1, 1, 11))
+    booking = await service.create_booking_service(db, booking_in, user.id, facility.id)
+    # booking, resource with price and series check, UPDATE with the rollup upsert
+    with assert_max_queries(3, db_engine):
+        updated = await service.update_booking_service(db, booking.id, BookingUpdate(resource_id=other.id, end_time=datetime(2030, 1, 1, 11, 30)))
+    assert (updated.resource_id, updated.total_price) == (other.id, 45)
+    rollups = await db.execute(select(BookingRollups.resource_id, BookingRollups.day, BookingRollups.booking_count, BookingRollups.booked_minutes))
+    assert set(rollups.all()) == {(resource.id, date(2030, 1, 1), 0, 0), (other.id, date(2030, 1, 1), 1, 90)}
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src import crud, service
+from src.schemas import BookingCreate, BookingSeriesCreate
+from src.utils import expand_series, series_ends_at, series_step
+
+# Mondays 18:00-19:30
+FIRST_START, FIRST_END = datetime(2030, 1, 7, 18), datetime(2030, 1, 7, 19, 30)
+DURATION = FIRST_END - FIRST_START
+
+
+def expand_all(step: timedelta, ends_at: datetime) -> list[tuple[datetime, datetime]]:
+    return expand_series(FIRST_START, FIRST_END, step, ends_at, FIRST_START, ends_at)
+
+
+def test_weekly_every_other_week_with_count():
+    step = series_step("weekly", 2)
+    ends_at = series_ends_at(FIRST_START, FIRST_END, step, 4, None)
+    assert ends_at == FIRST_END + timedelta(weeks=6)
+    assert [start for start, _ in expand_all(step, ends_at)] == [FIRST_START + timedelta(weeks=n) for n in (0, 2, 4, 6)]
+
+
+def test_daily_every_third_day_until():
+    step = series_step("daily", 3)
+    # until falls between the occurrences on day 9 and day 12
+    ends_at = series_ends_at(FIRST_START, FIRST_END, step, None, FIRST_START + timedelta(days=10))
+    occurrences = expand_all(step, ends_at)
+    assert [start for start, _ in occurrences] == [FIRST_START + timedelta(days=n) for n in (0, 3, 6, 9)]
+    assert all(end - start == DURATION for start, end in occurrences)
+
+
+def test_until_on_an_occurrence_includes_it():
+    step = series_step("daily", 3)
+    ends_at = series_ends_at(FIRST_START, FIRST_END, step, None, FIRST_START + timedelta(days=9))
+    assert ends_at == FIRST_END + timedelta(days=9)
+
+
+def test_the_earlier_of_count_and_until_wins():
+    step = series_step("weekly", 1)
+    assert series_ends_at(FIRST_START, FIRST_END, step, 3, FIRST_START + timedelta(weeks=10)) == FIRST_END + timedelta(weeks=2)
+    assert series_ends_at(FIRST_START, FIRST_END, step, 10, FIRST_START + timedelta(weeks=3)) == FIRST_END + timedelta(weeks=3)
+
+
+def test_window_in_the_middle_of_a_series():
+    step = series_step("weekly", 2)
+    ends_at = series_ends_at(FIRST_START, FIRST_END, step, 10, None)
+    # starts halfway through the third occurrence, which still counts
+    window_start = FIRST_START + timedelta(weeks=4, minutes=45)
+    window_end = FIRST_START + timedelta(weeks=8)
+    occurrences = expand_series(FIRST_START, FIRST_END, step, ends_at, window_start, window_end)
+    assert [start for start, _ in occurrences] == [FIRST_START + timedelta(weeks=n) for n in (4, 6)]
+    # a window past the end of the series is empty
+    assert expand_series(FIRST_START, FIRST_END, step, ends_at, ends_at, ends_at + timedelta(weeks=4)) == []
+
+
+@pytest.fixture
+async def series(db, facility, resource, user):
+    series_in = BookingSeriesCreate(resource_id=resource.id, start_time=FIRST_START, end_time=FIRST_END, frequency="weekly", interval=2, count=5)
+    return await service.create_booking_series_service(db, series_in, user.id, facility.id)
+
+
+@pytest.mark.anyio
+async def test_series_overlap_uses_the_nearest_occurrence(db, resource, series):
+    async def overlaps(start: datetime, end: datetime) -> bool:
+        return await crud.check_series_conflict(db, resource.id, start, end)
+
+    third = FIRST_START + timedelta(weeks=4)
+    assert await overlaps(third + timedelta(minutes=30), third + timedelta(hours=3))
+    assert await overlaps(third - timedelta(hours=1), third + timedelta(minutes=1))
+    # touching the occurrence, in the off week, and after the last occurrence
+    assert not await overlaps(third - timedelta(hours=1), third)
+    assert not await overlaps(third + DURATION, third + timedelta(hours=3))
+    assert not await overlaps(third + timedelta(weeks=1), third + timedelta(weeks=1, hours=1))
+    assert not await overlaps(FIRST_START + timedelta(weeks=10), FIRST_END + timedelta(weeks=10))
+
+
+@pytest.mark.anyio
+async def test_single_booking_on_an_occurrence_is_rejected(db, facility, resource, user, series):
+    def booking(start: datetime) -> BookingCreate:
+        return BookingCreate(resource_id=resource.id, start_time=start, end_time=start + timedelta(hours=1))
+
+    with pytest.raises(HTTPException) as exc:
+        await service.create_booking_service(db, booking(FIRST_START + timedelta(weeks=6, minutes=30)), user.id, facility.id)
+    assert exc.value.status_code == 400
+    off_week = await service.create_booking_service(db, booking(FIRST_START + timedelta(weeks=3)), user.id, facility.id)
+    assert off_week.start_time == FIRST_START + timedelta(weeks=3)
@@ -0,0 +1,94 @@
+import io
+
+import pytest
+from fastapi import UploadFile
+from moto import mock_aws
+from starlette.datastructures import Headers
+
+from src.core import storage
+from src.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+PART_SIZE = 5 * 1024 * 1024
+BUCKET = "bookacourt-test"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setattr(settings, "OBJECT_STORAGE_ENDPOINT", None)
+    monkeypatch.setattr(settings, "OBJECT_STORAGE_ACCESS_KEY", "testing")
+    monkeypatch.setattr(settings, "OBJECT_STORAGE_SECRET_KEY", "testing")
+    monkeypatch.setattr(settings, "OBJECT_STORAGE_REGION", "us-east-1")
+    monkeypatch.setattr(settings, "OBJECT_STORAGE_BUCKET_NAME", BUCKET)
+    monkeypatch.setattr(settings, "OBJECT_STORAGE_PART_SIZE", PART_SIZE)
+    monkeypatch.setattr(settings, "OBJECT_STORAGE_PART_CONCURRENCY", 2)
+    with mock_aws():
+        storage.get_s3_client.cache_clear()
+        client = storage.get_s3_client()
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    storage.get_s3_client.cache_clear()
+
+
+def upload_file(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="court.jpg", headers=Headers({"content-type": "image/jpeg"}))
+
+
+def body(size: int) -> bytes:
+    return bytes(i % 251 for i in range(size))
+
+
+def stored(client, key: str) -> tuple[bytes, str]:
+    obj = client.get_object(Bucket=BUCKET, Key=key)
+    return obj["Body"].read(), obj["ETag"].strip('"')
+
+
+async def test_body_below_part_size_is_a_single_put(s3):
+    data = body(1024)
+    assert await storage.upload_file_to_storage("small.jpg", upload_file(data)) == "small.jpg"
+    content, etag = stored(s3, "small.jpg")
+    assert content == data
+    # multipart ETags end in -<part count>
+    assert "-" not in etag
+    assert s3.head_object(Bucket=BUCKET, Key="small.jpg")["ContentType"] == "image/jpeg"
+
+
+async def test_large_body_goes_multipart(s3):
+    data = body(2 * PART_SIZE + 123)
+    await storage.upload_file_to_storage("large.jpg", upload_file(data))
+    content, etag = stored(s3, "large.jpg")
+    assert content == data
+    assert etag.endswith("-3")
+
+
+async def test_exact_multiple_of_part_size_sends_no_empty_part(s3):
+    data = body(2 * PART_SIZE)
+    await storage.upload_file_to_storage("exact.jpg", upload_file(data))
+    content, etag = stored(s3, "exact.jpg")
+    assert content == data
+    assert etag.endswith("-2")
+
+
+async def test_failed_part_aborts_the_upload(s3, monkeypatch):
+    upload_part = s3.upload_part
+
+    def fail_second_part(**kwargs):
+        if kwargs["PartNumber"] == 2:
+            raise RuntimeError("connection reset")
+        return upload_part(**kwargs)
+
+    aborted = []
+    abort = s3.abort_multipart_upload
+
+    def record_abort(**kwargs):
+        aborted.append(kwargs["UploadId"])
+        return abort(**kwargs)
+
+    monkeypatch.setattr(s3, "upload_part", fail_second_part)
+    monkeypatch.setattr(s3, "abort_multipart_upload", record_abort)
+    with pytest.raises(RuntimeError, match="connection reset"):
+        await storage.upload_file_to_storage("broken.jpg", upload_file(body(3 * PART_SIZE)))
+    assert len(aborted) == 1
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert s3.list_objects_v2(Bucket=BUCKET).get("KeyCount") == 0
@@ -0,0 +1,37 @@
+import pytest
+
+from src import crud
+from src.core.cache import user_cache
+from src.router.depandency import get_cached_user
+from src.schemas import UserUpdate
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+async def test_deactivating_a_user_evicts_the_cached_entry(db, user):
+    key = str(user.id)
+    assert (await get_cached_user(db, key)).is_active
+    assert user_cache.get(key) is not None
+
+    await crud.update_user(db, user, UserUpdate(is_active=False))
+    assert user_cache.get(key) is None
+    assert not (await get_cached_user(db, key)).is_active
+
+
+async def test_other_workers_drop_their_copy_on_the_next_request(db, user):
+    key = str(user.id)
+    await crud.update_user(db, user, UserUpdate(is_superuser=True))
+    assert (await get_cached_user(db, key)).is_superuser
+
+    # a worker that didn't handle the demotion still holds the old snapshot
+    stale = user_cache.get(key)
+    await crud.update_user(db, user, UserUpdate(is_superuser=False))
+    user_cache.set(key, stale)
+    assert not (await get_cached_user(db, key)).is_superuser